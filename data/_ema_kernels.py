@@ -0,0 +1,39 @@
+"""EMA kernels over a closes sequence (oldest -> newest).
+
+Plain-Python tight loops: no per-element attribute lookups, constants hoisted.
+"""
+from typing import Sequence, Tuple
+
+
+def _alpha(period: int) -> float:
+    # period <= 1 退化为最后一个价格
+    period = int(period)
+    if period <= 1:
+        return 1.0
+    return 2.0 / (period + 1.0)
+
+
+def ema_last(closes: Sequence[float], period: int) -> float:
+    n = len(closes)
+    if n == 0:
+        return 0.0
+    k = _alpha(period)
+    e = float(closes[0])
+    for i in range(1, n):
+        e += k * (closes[i] - e)
+    return e
+
+
+def ema_fast_slow(closes: Sequence[float], fast: int, slow: int) -> Tuple[float, float]:
+    """一次遍历同时算 fast / slow 两条 EMA。"""
+    n = len(closes)
+    if n == 0:
+        return 0.0, 0.0
+    kf = _alpha(fast)
+    ks = _alpha(slow)
+    ef = es = float(closes[0])
+    for i in range(1, n):
+        v = closes[i]
+        ef += kf * (v - ef)
+        es += ks * (v - es)
+    return ef, es
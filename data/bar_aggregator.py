@@ -1,7 +1,9 @@
-import threading
-from collections import deque
+from array import array
 from typing import Optional, Dict, Any
 
+# 列式存储（SoA）：每个字段一个连续的 typed array，环形覆盖
+_FLOAT_COLS = ("open", "high", "low", "close", "ema_fast", "ema_slow")
+
 class EMARolling:
     def __init__(self, period: int):
         self.period = period
@@ -22,9 +24,14 @@ class BarAggregator:
         self._ema_fast = EMARolling(fast)
         self._ema_slow = EMARolling(slow)
 
-        self._bars = deque(maxlen=max_bars)
-        self._latest_bar: Optional[Dict[str, Any]] = None
-        self._lock = threading.Lock()
+        self._n = int(max_bars)
+        if self._n < 1:
+            raise ValueError("BarAggregator requires max_bars >= 1")
+        self._ts = array("q", bytes(8 * self._n))
+        self._cols: Dict[str, array] = {c: array("d", bytes(8 * self._n)) for c in _FLOAT_COLS}
+        # 单写者（WS 线程）多读者：_seq = 已写入的 bar 总数。
+        # 写者先写完槽位再发布 _seq（int 赋值在 GIL 下是原子的），读者无需加锁。
+        self._seq = 0
 
     def on_candle(self, candle_row):
         ts = int(candle_row[0])
@@ -36,20 +43,42 @@ class BarAggregator:
         ef = float(self._ema_fast.update(c))
         es = float(self._ema_slow.update(c))
 
-        bar = {
-            "ts": ts,
-            "open": o,
-            "high": h,
-            "low": l,
-            "close": c,
-            "ema_fast": ef,
-            "ema_slow": es,
-        }
+        cols = self._cols
+        seq = self._seq
+        i = seq % self._n
+        self._ts[i] = ts
+        cols["open"][i] = o
+        cols["high"][i] = h
+        cols["low"][i] = l
+        cols["close"][i] = c
+        cols["ema_fast"][i] = ef
+        cols["ema_slow"][i] = es
+        self._seq = seq + 1  # publish
 
-        with self._lock:
-            self._bars.append(bar)
-            self._latest_bar = bar
+    def on_candles(self, rows):
+        """一帧多行（如回补）时批量喂入，可直接作为 OKXPublicWS 的 on_candles。"""
+        on_candle = self.on_candle
+        for row in rows:
+            on_candle(row)
 
     def latest_bar(self) -> Optional[Dict[str, Any]]:
-        with self._lock:
-            return dict(self._latest_bar) if self._latest_bar else None
+        seq = self._seq
+        if seq == 0:
+            return None
+        i = (seq - 1) % self._n
+        bar: Dict[str, Any] = {"ts": self._ts[i]}
+        for c in _FLOAT_COLS:
+            bar[c] = self._cols[c][i]
+        return bar
+
+    def __len__(self) -> int:
+        return min(self._seq, self._n)
+
+    def column(self, name: str) -> array:
+        """按时间顺序（oldest->newest）返回某一列的连续副本，可直接喂给指标计算。"""
+        col = self._ts if name == "ts" else self._cols[name]
+        seq = self._seq
+        if seq <= self._n:
+            return col[:seq]
+        i = seq % self._n
+        return col[i:] + col[:i]
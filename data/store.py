@@ -1,58 +1,125 @@
 import sqlite3
 import json
+import threading
 import time
-from typing import Any, Optional, Dict
+from contextlib import contextmanager
+from typing import Any, Optional, Dict, Iterable, Iterator, Tuple
 
 class SQLiteStore:
     def __init__(self, path: str):
-        self.conn = sqlite3.connect(path, check_same_thread=False)
+        # isolation_level=None：关闭 sqlite3 的隐式事务，由 transaction() 显式 BEGIN/COMMIT
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
         self.conn.execute("PRAGMA journal_mode=WAL;")
+        # WAL 下 NORMAL 只在 checkpoint 时 fsync，掉电最多丢最近几笔 KV，不会损坏库
+        self.conn.execute("PRAGMA synchronous=NORMAL;")
+        self.conn.execute("PRAGMA busy_timeout=5000;")
+        self.conn.execute("PRAGMA cache_size=-65536;")  # 64 MiB
+        self.conn.execute("PRAGMA temp_store=MEMORY;")
+        self.conn.execute("PRAGMA mmap_size=268435456;")  # 256 MiB
+        self.conn.execute("PRAGMA wal_autocheckpoint=1000;")
+        # WS 线程和主循环共用同一个连接：写操作串行化
+        self._write_lock = threading.RLock()
+        self._tx_depth = 0
         self._init_schema()
 
     def _init_schema(self):
-        self.conn.execute("""
-        CREATE TABLE IF NOT EXISTS kv (
-            k TEXT PRIMARY KEY,
-            v TEXT NOT NULL,
-            updated_at REAL NOT NULL
-        );
-        """)
-        self.conn.execute("""
-        CREATE TABLE IF NOT EXISTS orders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ts REAL NOT NULL,
-            inst_id TEXT NOT NULL,
-            cl_ord_id TEXT,
-            ord_id TEXT,
-            side TEXT,
-            pos_side TEXT,
-            sz TEXT,
-            tp_trigger TEXT,
-            sl_trigger TEXT,
-            raw_json TEXT NOT NULL,
-            note TEXT
-        );
-        """)
-        self.conn.commit()
+        with self.transaction():
+            self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS kv (
+                k TEXT PRIMARY KEY,
+                v TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            """)
+            self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS orders (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                inst_id TEXT NOT NULL,
+                cl_ord_id TEXT,
+                ord_id TEXT,
+                side TEXT,
+                pos_side TEXT,
+                sz TEXT,
+                tp_trigger TEXT,
+                sl_trigger TEXT,
+                raw_json TEXT NOT NULL,
+                note TEXT
+            );
+            """)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """把多次写入合并成一个事务（一次 fsync）。
+
+        可嵌套：只有最外层负责 BEGIN IMMEDIATE / COMMIT（异常则 ROLLBACK）。
+        """
+        with self._write_lock:
+            if self._tx_depth > 0:
+                self._tx_depth += 1
+                try:
+                    yield
+                finally:
+                    self._tx_depth -= 1
+                return
+
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._tx_depth = 1
+            try:
+                yield
+            except BaseException:
+                self._tx_depth = 0
+                self.conn.execute("ROLLBACK")
+                raise
+            self._tx_depth = 0
+            self.conn.execute("COMMIT")
+
+    _SET_KV_SQL = (
+        "INSERT INTO kv(k,v,updated_at) VALUES(?,?,?) "
+        "ON CONFLICT(k) DO UPDATE SET v=excluded.v, updated_at=excluded.updated_at"
+    )
 
     def set_kv(self, k: str, v: str):
         now = time.time()
-        self.conn.execute(
-            "INSERT INTO kv(k,v,updated_at) VALUES(?,?,?) "
-            "ON CONFLICT(k) DO UPDATE SET v=excluded.v, updated_at=excluded.updated_at",
-            (k, v, now),
-        )
-        self.conn.commit()
+        with self._write_lock:
+            self.conn.execute(self._SET_KV_SQL, (k, v, now))
+
+    def mset(self, mapping: Dict[str, str]):
+        """一次事务写多个 KV（executemany）。"""
+        if not mapping:
+            return
+        now = time.time()
+        with self.transaction():
+            self.conn.executemany(self._SET_KV_SQL, [(k, v, now) for k, v in mapping.items()])
 
     def del_kv(self, k: str):
-        self.conn.execute("DELETE FROM kv WHERE k=?", (k,))
-        self.conn.commit()
+        with self._write_lock:
+            self.conn.execute("DELETE FROM kv WHERE k=?", (k,))
+
+    def delete_many(self, keys: Iterable[str]):
+        """一条 DELETE ... IN (...) 删多个 KV。"""
+        keys = tuple(keys)
+        if not keys:
+            return
+        sql = "DELETE FROM kv WHERE k IN (%s)" % ",".join("?" * len(keys))
+        with self._write_lock:
+            self.conn.execute(sql, keys)
 
     def get_kv(self, k: str) -> Optional[str]:
         cur = self.conn.execute("SELECT v FROM kv WHERE k=?", (k,))
         row = cur.fetchone()
         return row[0] if row else None
 
+    def mget(self, keys: Iterable[str]) -> Dict[str, Optional[str]]:
+        """一条 SELECT ... IN (...) 取多个 KV；不存在的 key 值为 None。"""
+        out: Dict[str, Optional[str]] = dict.fromkeys(keys)
+        if not out:
+            return out
+        sql = "SELECT k, v FROM kv WHERE k IN (%s)" % ",".join("?" * len(out))
+        for k, v in self.conn.execute(sql, tuple(out)):
+            out[k] = v
+        return out
+
     def get_kv_float(self, k: str) -> Optional[float]:
         v = self.get_kv(k)
         if v is None:
@@ -62,7 +129,7 @@ class SQLiteStore:
         except:
             return None
 
-    def save_order(
+    def _order_row(
         self,
         inst_id: str,
         side: str,
@@ -73,7 +140,7 @@ class SQLiteStore:
         resp_json: Dict[str, Any],
         note: str = "",
         cl_ord_id: str = "",
-    ):
+    ) -> Tuple[Any, ...]:
         ord_id = ""
         cl_from_resp = ""
         try:
@@ -85,10 +152,43 @@ class SQLiteStore:
 
         raw = json.dumps(resp_json, ensure_ascii=False)
         cl_final = cl_ord_id or cl_from_resp
+        return (time.time(), inst_id, cl_final, ord_id, side, pos_side, sz, tp_trigger, sl_trigger, raw, note)
+
+    _INSERT_ORDER_SQL = (
+        "INSERT INTO orders(ts,inst_id,cl_ord_id,ord_id,side,pos_side,sz,tp_trigger,sl_trigger,raw_json,note) "
+        "VALUES(?,?,?,?,?,?,?,?,?,?,?)"
+    )
 
-        self.conn.execute(
-            "INSERT INTO orders(ts,inst_id,cl_ord_id,ord_id,side,pos_side,sz,tp_trigger,sl_trigger,raw_json,note) "
-            "VALUES(?,?,?,?,?,?,?,?,?,?,?)",
-            (time.time(), inst_id, cl_final, ord_id, side, pos_side, sz, tp_trigger, sl_trigger, raw, note),
+    def save_order(
+        self,
+        inst_id: str,
+        side: str,
+        pos_side: str,
+        sz: str,
+        tp_trigger: str,
+        sl_trigger: str,
+        resp_json: Dict[str, Any],
+        note: str = "",
+        cl_ord_id: str = "",
+    ):
+        row = self._order_row(
+            inst_id=inst_id,
+            side=side,
+            pos_side=pos_side,
+            sz=sz,
+            tp_trigger=tp_trigger,
+            sl_trigger=sl_trigger,
+            resp_json=resp_json,
+            note=note,
+            cl_ord_id=cl_ord_id,
         )
-        self.conn.commit()
+        with self._write_lock:
+            self.conn.execute(self._INSERT_ORDER_SQL, row)
+
+    def save_orders_many(self, rows: Iterable[Dict[str, Any]]):
+        """批量写订单：rows 每项是 save_order 的关键字参数，整体一个事务 + executemany。"""
+        params = [self._order_row(**r) for r in rows]
+        if not params:
+            return
+        with self.transaction():
+            self.conn.executemany(self._INSERT_ORDER_SQL, params)
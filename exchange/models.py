@@ -1,4 +1,18 @@
-from dataclasses import dataclass
+import math
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Optional
+
+
+def _pow10_exp(step: float) -> Optional[int]:
+    """step == 10**-k（k >= 0，如 1 / 0.1 / 0.01）时返回 k，否则 None。"""
+    if step <= 0 or step > 1:
+        return None
+    k = round(-math.log10(step))
+    if abs(step * 10 ** k - 1.0) < 1e-12:
+        return int(k)
+    return None
+
 
 @dataclass(frozen=True)
 class InstrumentSpec:
@@ -7,3 +21,20 @@ class InstrumentSpec:
     lot_sz: float
     min_sz: float
     tick_sz: float
+
+    # Decimal 版本在构造时算一次，下单路径上的 floor/round 直接复用
+    ct_val_d: Decimal = field(init=False, repr=False, compare=False)
+    lot_sz_d: Decimal = field(init=False, repr=False, compare=False)
+    min_sz_d: Decimal = field(init=False, repr=False, compare=False)
+    tick_sz_d: Decimal = field(init=False, repr=False, compare=False)
+    # 步长是 10 的负整数次幂时的指数（走纯 float 快速路径），否则 None
+    lot_pow10: Optional[int] = field(init=False, repr=False, compare=False)
+    tick_pow10: Optional[int] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "ct_val_d", Decimal(str(self.ct_val)))
+        object.__setattr__(self, "lot_sz_d", Decimal(str(self.lot_sz)))
+        object.__setattr__(self, "min_sz_d", Decimal(str(self.min_sz)))
+        object.__setattr__(self, "tick_sz_d", Decimal(str(self.tick_sz)))
+        object.__setattr__(self, "lot_pow10", _pow10_exp(self.lot_sz))
+        object.__setattr__(self, "tick_pow10", _pow10_exp(self.tick_sz))
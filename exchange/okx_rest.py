@@ -5,7 +5,7 @@ exchange/okx_rest.py  (Verified/Final)
 这一版解决你在实战里遇到的所有典型坑：
 - ✅ 正确 OKX v5 签名：request_path 必须包含 query string
 - ✅ 模拟盘：x-simulated-trading: 1
-- ✅ HTTP 代理（requests）
+- ✅ HTTP 代理（urllib3 ProxyManager）
 - ✅ account/config 拉取 posMode（你的账户是 long_short_mode，需要 posSide）
 - ✅ set-leverage：使用 mgnMode（isolated/cross），且 hedge 模式分别设置 long/short
 - ✅ 交易接口“表面成功”陷阱：顶层 code=0 但 data[0].sCode != 0 -> 直接抛错（避免 60s 后查不到订单）
@@ -23,23 +23,119 @@ from __future__ import annotations
 import base64
 import hashlib
 import hmac
-import json
+import itertools
+import math
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from decimal import Decimal, ROUND_DOWN
-from typing import Any, Dict, Optional, List, Tuple
-from urllib.parse import urlencode
+from typing import Any, Dict, Optional, List, Sequence, Tuple, Union
+from urllib.parse import quote_plus, urlsplit
+from urllib.request import getproxies, proxy_bypass, proxy_bypass_environment
 
-import requests
+import urllib3
 
 from utils.logger import get_logger
 from utils.retry import retry
+from utils.fastjson import dumps_bytes, loads as json_loads
 from exchange.models import InstrumentSpec
+from data._ema_kernels import ema_fast_slow, ema_last
 
 log = get_logger()
 
 
+# 会在 data[i] 里返回 sCode/sMsg 的交易写接口
+_TRADE_OP_PATHS = frozenset((
+    "/api/v5/trade/order",
+    "/api/v5/trade/batch-orders",
+    "/api/v5/trade/cancel-order",
+    "/api/v5/trade/cancel-batch-orders",
+    "/api/v5/trade/amend-order",
+    "/api/v5/trade/amend-batch-orders",
+    "/api/v5/trade/order-algo",
+    "/api/v5/trade/cancel-algos",
+    "/api/v5/trade/amend-algos",
+))
+
+
+def _text(raw: bytes) -> str:
+    return raw.decode("utf-8", errors="replace")
+
+
+# OKX 限频：HTTP 429，或顶层 code=50011 (Too Many Requests) / 50061 (sub-account 限频)
+_RATE_LIMIT_CODES = frozenset(("50011", "50061"))
+
+
+class RateLimited(RuntimeError):
+    """被交易所限频。wait 为建议等待秒数（来自 Retry-After），@retry 会优先按它 sleep。"""
+
+    def __init__(self, msg: str, wait: Optional[float] = None):
+        super().__init__(msg)
+        self.wait = wait
+
+
+def _retry_after(headers) -> Optional[float]:
+    v = headers.get("Retry-After")
+    if not v:
+        return None
+    try:
+        return max(0.0, float(v))
+    except (TypeError, ValueError):
+        return None  # HTTP-date 形式 OKX 不用，忽略
+
+
+_HEDGE_MODES = frozenset(("long_short_mode", "long_short", "hedge", "longshortmode"))
+
+# get_order_anywhere 翻历史时，以下单时间为中心的查询窗口（毫秒）
+_HISTORY_WINDOW_MS = 600_000
+# 从 clOrdId 解析出的时间离现在超过这个范围就不当时间戳用（毫秒，约 1 年）
+_CLORDID_TS_MAX_SKEW_MS = 366 * 86_400_000
+
+
+def _clordid_ts_ms(cl_ord_id: str) -> Optional[int]:
+    """旧版 place_market_with_tp_sl 的默认 clOrdId 是 Q<13 位 epoch ms>，能解析就返回时间。
+
+    新版默认 id 是 Q<monotonic_ns hex><计数 hex>，碰巧 13 位全是数字时也会匹配格式；
+    解析值不在当前时间 ±1 年内的一律视为不是时间戳，退回不限时间窗口的翻页查询。
+    """
+    if len(cl_ord_id) == 14 and cl_ord_id[0] == "Q" and cl_ord_id[1:].isdigit():
+        ts_ms = int(cl_ord_id[1:])
+        if abs(ts_ms - time.time() * 1000) <= _CLORDID_TS_MAX_SKEW_MS:
+            return ts_ms
+    return None
+
+
+def _resolve_proxy(base_url: str, proxy_url: str, no_proxy: str) -> str:
+    """base_url 实际要走的代理（空串=直连），语义对齐 requests 的 trust_env：
+
+    - 命中 proxy.no_proxy 或环境 NO_PROXY 的 host 直连；
+    - 配置了 proxy.url 用它，否则退回环境变量 HTTP(S)_PROXY。
+    base_url 固定，只在初始化时算一次。
+    """
+    u = urlsplit(base_url)
+    host = u.hostname or ""
+    if no_proxy and proxy_bypass_environment(host, {"no": no_proxy}):
+        return ""
+    if proxy_bypass(host):
+        return ""
+    if proxy_url:
+        return proxy_url
+    return getproxies().get(u.scheme, "")
+
+
+def _with_query(path: str, params: Dict[str, Any]) -> str:
+    """path + ?query，单次遍历跳过 None（编码规则与 urlencode 一致：quote_plus）。"""
+    parts = []
+    for k, v in params.items():
+        if v is None:
+            continue
+        parts.append(f"{quote_plus(str(k))}={quote_plus(str(v))}")
+    if not parts:
+        return path
+    return f"{path}?{'&'.join(parts)}"
+
+
 class OKXRest:
     def __init__(self, cfg: dict, store):
         self.cfg = cfg or {}
@@ -55,6 +151,8 @@ class OKXRest:
         self.api_key: str = str(auth.get("api_key", "")).strip()
         self.api_secret: str = str(auth.get("api_secret", "")).strip()
         self.passphrase: str = str(auth.get("passphrase", "")).strip()
+        # 预先算好 ipad/opad 的 HMAC 状态，每次签名只 copy() + update()
+        self._hmac_template = hmac.new(self.api_secret.encode("utf-8"), b"", hashlib.sha256)
 
         account = self.cfg.get("account") or {}
         self.td_mode: str = str(account.get("td_mode", "isolated")).strip()
@@ -65,19 +163,45 @@ class OKXRest:
         self.proxy_url: str = str(proxy_cfg.get("url", "")).strip() if self.proxy_enabled else ""
         self.no_proxy: str = str(proxy_cfg.get("no_proxy", "")).strip()
 
-        self.session = requests.Session()
-        self.session.headers.update({"Content-Type": "application/json"})
+        # 连接池：直接用 urllib3（固定 base_url、无重定向/cookie，不需要 requests 那层开销）
+        # 行情/账户/下单复用同一批 keep-alive TLS 连接；重试交给 @retry，这里不重试
+        pool_maxsize = int(env.get("http_pool_maxsize", 16) or 16)
+        pool_kw = {"num_pools": 4, "maxsize": pool_maxsize, "retries": False}
+        # urllib3 不读环境变量：no_proxy / HTTP(S)_PROXY 在这里显式解析
+        use_proxy = _resolve_proxy(self.base_url, self.proxy_url, self.no_proxy)
+        if use_proxy:
+            proxy_auth = urllib3.util.parse_url(use_proxy).auth
+            proxy_headers = urllib3.make_headers(proxy_basic_auth=proxy_auth) if proxy_auth else None
+            self._pool = urllib3.ProxyManager(use_proxy, proxy_headers=proxy_headers, **pool_kw)
+        else:
+            self._pool = urllib3.PoolManager(**pool_kw)
+        self._base_headers: Dict[str, str] = {
+            "Content-Type": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+        }
 
-        if self.proxy_url:
-            self.session.proxies.update({"http": self.proxy_url, "https": self.proxy_url})
+        # REST 已在上面用过 no_proxy；这里仍导出给 websocket-client 的环境代理解析
         if self.no_proxy:
             os.environ["NO_PROXY"] = self.no_proxy
 
         # cache/state
         self._spec_cache: Dict[str, InstrumentSpec] = {}
-        self.pos_mode: str = ""   # long_short_mode / net_mode
+        self._clid_counter = itertools.count()
+        self._public_path_cache: Dict[Tuple[str, Tuple[Tuple[str, Any], ...]], str] = {}
+        self._is_hedge: bool = False
+        self.pos_mode = ""   # long_short_mode / net_mode（setter 同步刷新 _is_hedge）
         self.acct_lv: str = ""
 
+    @property
+    def pos_mode(self) -> str:
+        return self._pos_mode
+
+    @pos_mode.setter
+    def pos_mode(self, value: str) -> None:
+        # 下单热路径只读 _is_hedge；posMode 变化时在这里重算一次
+        self._pos_mode = value or ""
+        self._is_hedge = self._pos_mode.lower() in _HEDGE_MODES
+
     # ---------------------------------------------------------------------
     # Time & signing
     # ---------------------------------------------------------------------
@@ -86,12 +210,14 @@ class OKXRest:
         """2020-12-08T09:08:57.715Z"""
         return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
 
-    def _sign(self, ts: str, method: str, request_path: str, body: str) -> str:
-        prehash = f"{ts}{method.upper()}{request_path}{body}"
-        mac = hmac.new(self.api_secret.encode("utf-8"), prehash.encode("utf-8"), hashlib.sha256)
+    def _sign(self, ts: str, method: str, request_path: str, body: bytes) -> str:
+        # body 已是 UTF-8 bytes（与实际发送的字节一致），不再重复 encode
+        mac = self._hmac_template.copy()
+        mac.update(f"{ts}{method.upper()}{request_path}".encode("utf-8"))
+        mac.update(body)
         return base64.b64encode(mac.digest()).decode("utf-8")
 
-    def _headers(self, ts: str, method: str, request_path: str, body: str) -> Dict[str, str]:
+    def _headers(self, ts: str, method: str, request_path: str, body: bytes) -> Dict[str, str]:
         return {
             "OK-ACCESS-KEY": self.api_key,
             "OK-ACCESS-SIGN": self._sign(ts, method, request_path, body),
@@ -116,50 +242,61 @@ class OKXRest:
         data = data or {}
 
         # ✅ 关键：签名必须包含 query string
-        query = urlencode({k: v for k, v in params.items() if v is not None})
-        request_path = path + (f"?{query}" if query else "")
+        if not auth and method == "GET":
+            # 公共 GET（candles/instruments）参数固定：request_path 按参数缓存
+            ck = (path, tuple(params.items()))
+            request_path = self._public_path_cache.get(ck)
+            if request_path is None:
+                request_path = _with_query(path, params)
+                if len(self._public_path_cache) >= 64:
+                    self._public_path_cache.clear()
+                self._public_path_cache[ck] = request_path
+        else:
+            request_path = _with_query(path, params)
         url = self.base_url + request_path
 
-        body_str = ""
-        if method in ("POST", "PUT"):
-            body_str = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
-        else:
-            body_str = ""
+        # body 只序列化一次：签名与发送共用同一份 bytes
+        body = dumps_bytes(data) if method in ("POST", "PUT") else b""
 
-        headers: Dict[str, str] = {}
+        headers: Dict[str, str] = dict(self._base_headers)
         if auth:
             if not (self.api_key and self.api_secret and self.passphrase):
                 raise RuntimeError("Missing OKX API credentials in config.auth")
             ts = self._iso_ts()
-            headers.update(self._headers(ts, method, request_path, body_str))
+            headers.update(self._headers(ts, method, request_path, body))
 
         if self.demo:
             headers["x-simulated-trading"] = "1"
 
         try:
-            if method == "GET":
-                r = self.session.get(url, headers=headers, timeout=self.timeout_sec)
-            elif method == "POST":
-                r = self.session.post(url, headers=headers, data=body_str.encode("utf-8"), timeout=self.timeout_sec)
-            elif method == "DELETE":
-                r = self.session.delete(url, headers=headers, timeout=self.timeout_sec)
-            else:
-                r = self.session.request(method, url, headers=headers, data=body_str.encode("utf-8"), timeout=self.timeout_sec)
-        except requests.RequestException as e:
+            r = self._pool.request(
+                method,
+                url,
+                body=body or None,
+                headers=headers,
+                timeout=self.timeout_sec,
+                retries=False,
+                redirect=False,
+            )
+        except urllib3.exceptions.HTTPError as e:
             raise RuntimeError(f"OKX HTTP request failed: {e}")
 
-        if r.status_code >= 400:
-            raise requests.HTTPError(f"{r.status_code} Client Error: {r.reason} for url: {r.url} | body={r.text}", response=r)
+        if r.status == 429:
+            raise RateLimited(f"OKX rate limited (429) url={url} | body={_text(r.data)}", _retry_after(r.headers))
+        if r.status >= 400:
+            raise RuntimeError(f"{r.status} Client Error: {r.reason} for url: {url} | body={_text(r.data)}")
 
         try:
-            resp = r.json()
+            resp = json_loads(r.data)  # 直接解析 bytes，不经 str 中转
         except Exception:
-            raise RuntimeError(f"OKX invalid JSON response: {r.text}")
+            raise RuntimeError(f"OKX invalid JSON response: {_text(r.data)}")
 
         code = str(resp.get("code") or "")
         msg = str(resp.get("msg") or "")
 
         if code != "0":
+            if code in _RATE_LIMIT_CODES:
+                raise RateLimited(f"OKX API error: code={code} msg={msg} resp={resp}", _retry_after(r.headers))
             # 50119: API key doesn't exist / region domain mismatch etc.
             if code == "50119":
                 # OKX FAQ: region/domain mismatch may cause 50119; EEA users use eea.okx.com; US users use us.okx.com
@@ -171,10 +308,10 @@ class OKXRest:
                 raise RuntimeError(f"OKX API error: code={code} msg={msg} {hint} resp={resp}")
             raise RuntimeError(f"OKX API error: code={code} msg={msg} resp={resp}")
 
-        # ✅ 关键：交易类接口顶层 code=0 也可能 data[0].sCode != 0
-        if path.startswith("/api/v5/trade/"):
-            rows = resp.get("data") or []
-            if isinstance(rows, list) and rows:
+        # ✅ 关键：交易类接口顶层 code=0 也可能 data[0].sCode != 0（只有写操作带 sCode）
+        if method == "POST" and path in _TRADE_OP_PATHS:
+            rows = resp.get("data")
+            if rows and isinstance(rows, list):
                 s_code = str(rows[0].get("sCode") or "0")
                 if s_code != "0":
                     s_msg = str(rows[0].get("sMsg") or "")
@@ -192,24 +329,29 @@ class OKXRest:
     def bootstrap(self) -> None:
         inst_id = str((self.cfg.get("trade") or {}).get("inst_id", "")).strip()
 
-        # warm spec
-        if inst_id:
+        # spec 与 account/config 互不依赖：并发拉取，耗时取 max(RTT) 而不是 sum(RTT)
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="okx-boot") as pool:
+            fut_spec = pool.submit(self._must_spec, inst_id) if inst_id else None
+            fut_cfg = pool.submit(self.get_account_config)
+
+            # warm spec
+            if fut_spec is not None:
+                try:
+                    fut_spec.result()
+                except Exception as e:
+                    log.warning("INSTRUMENT SPEC FETCH FAILED", extra={"inst": inst_id, "err": str(e)})
+
+            # account config
             try:
-                self._must_spec(inst_id)
+                cfg = fut_cfg.result()
+                info = (cfg.get("data") or [{}])[0]
+                self.pos_mode = str(info.get("posMode") or "").strip()
+                self.acct_lv = str(info.get("acctLv") or "").strip()
+                log.info("ACCOUNT CONFIG", extra={"posMode": self.pos_mode, "acctLv": self.acct_lv})
             except Exception as e:
-                log.warning("INSTRUMENT SPEC FETCH FAILED", extra={"inst": inst_id, "err": str(e)})
-
-        # account config
-        try:
-            cfg = self.get_account_config()
-            info = (cfg.get("data") or [{}])[0]
-            self.pos_mode = str(info.get("posMode") or "").strip()
-            self.acct_lv = str(info.get("acctLv") or "").strip()
-            log.info("ACCOUNT CONFIG", extra={"posMode": self.pos_mode, "acctLv": self.acct_lv})
-        except Exception as e:
-            log.warning("ACCOUNT CONFIG FETCH FAILED", extra={"err": str(e)})
+                log.warning("ACCOUNT CONFIG FETCH FAILED", extra={"err": str(e)})
 
-        # leverage
+        # leverage：依赖 posMode（hedge 需分别设置 long/short），必须在 account config 之后
         try:
             if inst_id and int(self.leverage) > 0:
                 self.set_leverage(inst_id=inst_id, lever=int(self.leverage), td_mode=self.td_mode)
@@ -249,11 +391,28 @@ class OKXRest:
     # Utils: rounding/format
     # ---------------------------------------------------------------------
 
-    def _floor_to_step(self, x: float, step: float) -> float:
+    def _floor_to_step(self, x: float, step: Union[float, Decimal], pow10: Optional[int] = None) -> float:
+        """step 传 InstrumentSpec 里预先算好的 Decimal（*_sz_d）时，省掉一次 Decimal(str(...))。
+
+        pow10 = k 表示 step == 10**-k：走 float 快路径。Decimal 路径按 str(x) 截断，
+        等价于取满足 n/f <= x 的最大整数 n（n/f 是正确舍入的 float）：floor(x*f) 可能
+        因乘法舍入偏 ±1，用 n/f、(n+1)/f 与 x 比较各修正一次，结果与 Decimal 路径逐位一致。
+        负数/非有限/超出 2**53 精度范围的退回 Decimal。
+        """
         if step <= 0:
             return float(x)
+        if pow10 is not None:
+            f = 10.0 ** pow10
+            y = x * f
+            if 0.0 <= y < 4e15:
+                n = math.floor(y)
+                if n / f > x:
+                    n -= 1
+                elif (n + 1) / f <= x:
+                    n += 1
+                return n / f
         xd = Decimal(str(x))
-        sd = Decimal(str(step))
+        sd = step if isinstance(step, Decimal) else Decimal(str(step))
         q = (xd / sd).to_integral_value(rounding=ROUND_DOWN) * sd
         return float(q)
 
@@ -261,10 +420,12 @@ class OKXRest:
         if px <= 0:
             return 0.0
         tid = inst_id or str((self.cfg.get("trade") or {}).get("inst_id") or "").strip()
-        tick = self._must_spec(tid).tick_sz if tid else 0.0
-        if tick <= 0:
+        if not tid:
+            return float(px)
+        spec = self._must_spec(tid)
+        if spec.tick_sz <= 0:
             return float(px)
-        return self._floor_to_step(px, tick)
+        return self._floor_to_step(px, spec.tick_sz_d, spec.tick_pow10)
 
     def _fmt_sz(self, sz: float) -> str:
         return format(Decimal(str(sz)).normalize(), "f")
@@ -282,17 +443,15 @@ class OKXRest:
             auth=False,
         )
 
-    def _ema(self, series: List[float], period: int) -> float:
-        if not series:
+    @staticmethod
+    def _safe_close(row) -> float:
+        try:
+            return float(row[4])
+        except Exception:
             return 0.0
-        period = int(period)
-        if period <= 1:
-            return float(series[-1])
-        k = 2.0 / (period + 1.0)
-        e = series[0]
-        for v in series[1:]:
-            e = v * k + e * (1.0 - k)
-        return float(e)
+
+    def _ema(self, series: List[float], period: int) -> float:
+        return float(ema_last(series, period))
 
     def get_latest_bar_with_ema(self, inst_id: str, bar: str, fast: int, slow: int, limit: int = 200) -> Tuple[dict, float, float]:
         resp = self.get_candles(inst_id=inst_id, bar=bar, limit=limit)
@@ -300,18 +459,15 @@ class OKXRest:
         if not data:
             return {}, 0.0, 0.0
 
-        rows = list(reversed(data))  # oldest->newest
-        closes: List[float] = []
-        for r in rows:
-            try:
-                closes.append(float(r[4]))
-            except Exception:
-                closes.append(0.0)
+        # OKX 返回 newest->oldest：直接反向迭代成 oldest->newest，不复制 rows
+        try:
+            closes: List[float] = [float(r[4]) for r in reversed(data)]
+        except Exception:
+            closes = [self._safe_close(r) for r in reversed(data)]
 
-        ema_fast = self._ema(closes, int(fast))
-        ema_slow = self._ema(closes, int(slow))
+        ema_fast, ema_slow = ema_fast_slow(closes, int(fast), int(slow))
 
-        last = rows[-1]
+        last = data[0]
         latest_bar = {"ts": last[0], "o": float(last[1]), "h": float(last[2]), "l": float(last[3]), "c": float(last[4])}
         return latest_bar, ema_fast, ema_slow
 
@@ -380,10 +536,7 @@ class OKXRest:
         def _call(payload: Dict[str, Any]) -> dict:
             return self._request("POST", "/api/v5/account/set-leverage", data=payload, auth=True)
 
-        pm = (self.pos_mode or "").lower()
-        is_hedge = pm in ("long_short_mode", "long_short", "hedge", "longshortmode")
-
-        if is_hedge:
+        if self._is_hedge:
             r1 = _call({"instId": inst_id, "lever": str(lever), "mgnMode": mgn_mode, "posSide": "long"})
             r2 = _call({"instId": inst_id, "lever": str(lever), "mgnMode": mgn_mode, "posSide": "short"})
             return {"code": "0", "data": [{"long": r1.get("data"), "short": r2.get("data")}]}
@@ -407,9 +560,7 @@ class OKXRest:
 
     def place_order(self, data: Dict[str, Any]) -> Dict[str, Any]:
         # hedge auto-fill posSide
-        pm = (self.pos_mode or "").lower()
-        is_hedge = pm in ("long_short_mode", "long_short", "hedge", "longshortmode")
-        if is_hedge and "posSide" not in data:
+        if self._is_hedge and "posSide" not in data:
             s = (data.get("side") or "").lower()
             if s == "buy":
                 data["posSide"] = "long"
@@ -446,7 +597,8 @@ class OKXRest:
             return {"code": "LOCAL_REJECT", "msg": "missing inst_id", "data": []}
 
         td_mode = (td_mode or str((self.cfg.get("account") or {}).get("td_mode") or "isolated")).strip()
-        clid = (cl_ord_id or idempotency_key or "").strip() or f"Q{int(time.time()*1000)}"
+        # 默认 clOrdId：monotonic_ns + 进程内计数器（hex），同一毫秒内连发也不会撞
+        clid = (cl_ord_id or idempotency_key or "").strip() or f"Q{time.monotonic_ns():x}{next(self._clid_counter):x}"
 
         data: Dict[str, Any] = {
             "instId": inst_id,
@@ -482,10 +634,24 @@ class OKXRest:
         cl_ord_id = (cl_ord_id or "").strip()
         return self._request("GET", "/api/v5/trade/order", params={"instId": inst_id, "clOrdId": cl_ord_id}, auth=True)
 
-    def _search_history_paged(self, path: str, inst_id: str, cl_ord_id: str, max_pages: int = 10, limit: int = 100) -> Optional[dict]:
+    def _search_history_paged(
+        self,
+        path: str,
+        inst_id: str,
+        cl_ord_id: str,
+        max_pages: int = 10,
+        limit: int = 100,
+        begin_ms: Optional[int] = None,
+        end_ms: Optional[int] = None,
+    ) -> Optional[dict]:
         after = None
         for _ in range(max_pages):
             params = {"instType": "SWAP", "instId": inst_id, "limit": str(limit)}
+            # begin/end：按订单创建时间窗口在服务端过滤，避免翻几周的历史
+            if begin_ms is not None:
+                params["begin"] = str(begin_ms)
+            if end_ms is not None:
+                params["end"] = str(end_ms)
             if after:
                 params["after"] = str(after)
             resp = self._request("GET", path, params=params, auth=True)
@@ -493,19 +659,22 @@ class OKXRest:
             for od in rows:
                 if str(od.get("clOrdId") or "") == cl_ord_id:
                     return {"code": "0", "data": [od]}
-            if not rows:
+            if len(rows) < limit:
                 return None
             after = rows[-1].get("ordId")
             if not after:
                 return None
         return None
 
-    def get_order_anywhere(self, inst_id: str, cl_ord_id: str) -> dict:
+    def get_order_anywhere(self, inst_id: str, cl_ord_id: str, created_ts_ms: Optional[int] = None) -> dict:
         """
         robust query:
           1) /trade/order
           2) /trade/orders-history (paged)
           3) /trade/orders-history-archive (paged)
+
+        created_ts_ms：下单时间（毫秒）。不传时尝试从旧版默认 clOrdId（Q<epoch ms>）里解析；
+        有时间就只查 [ts-10min, ts+10min] 窗口。
         """
         inst_id = (inst_id or "").strip()
         cl_ord_id = (cl_ord_id or "").strip()
@@ -518,13 +687,18 @@ class OKXRest:
             if "51603" not in str(e):
                 raise
 
-        found = self._search_history_paged("/api/v5/trade/orders-history", inst_id, cl_ord_id, max_pages=10, limit=100)
-        if found:
-            return found
+        ts_ms = created_ts_ms or _clordid_ts_ms(cl_ord_id)
+        begin_ms = end_ms = None
+        if ts_ms:
+            begin_ms = int(ts_ms) - _HISTORY_WINDOW_MS
+            end_ms = int(ts_ms) + _HISTORY_WINDOW_MS
 
-        found = self._search_history_paged("/api/v5/trade/orders-history-archive", inst_id, cl_ord_id, max_pages=10, limit=100)
-        if found:
-            return found
+        for path in ("/api/v5/trade/orders-history", "/api/v5/trade/orders-history-archive"):
+            found = self._search_history_paged(
+                path, inst_id, cl_ord_id, max_pages=10, limit=100, begin_ms=begin_ms, end_ms=end_ms
+            )
+            if found:
+                return found
 
         raise RuntimeError(f"Order not found in current nor history: clOrdId={cl_ord_id}")
 
@@ -611,36 +785,46 @@ class OKXRest:
         """
         if last_px <= 0:
             return 0.0
+        return self.calc_sizes_by_risk([last_px])[0]
+
+    def calc_sizes_by_risk(self, prices: Sequence[float]) -> List[float]:
+        """calc_size_by_risk 的批量版（回测/网格）：spec 与 equity 只取一次，逐价格算张数。"""
+        sizes = [0.0] * len(prices)
+        if not sizes:
+            return sizes
 
         inst_id = str((self.cfg.get("trade") or {}).get("inst_id") or "").strip()
         if not inst_id:
-            return 0.0
+            return sizes
 
         spec = self._must_spec(inst_id)
         if spec.ct_val <= 0:
-            return 0.0
+            return sizes
 
         risk_cfg = self.cfg.get("risk") or {}
         risk_pct = float(risk_cfg.get("risk_pct_per_trade", 0.0) or 0.0)
         if risk_pct <= 0:
-            return 0.0
+            return sizes
 
         equity = self.get_account_equity_usd()
         risk_notional = equity * risk_pct
         if risk_notional <= 0:
-            return 0.0
-
-        one_contract_notional = last_px * spec.ct_val
-        if one_contract_notional <= 0:
-            return 0.0
+            return sizes
 
-        raw_sz = risk_notional / one_contract_notional
-
-        lot = float(spec.lot_sz or 0.0)
+        ct_val = spec.ct_val
         min_sz = float(spec.min_sz or 0.0)
-        sz = self._floor_to_step(raw_sz, lot if lot > 0 else 1.0)
-
-        if min_sz > 0 and sz + 1e-12 < min_sz:
-            return 0.0
+        if float(spec.lot_sz or 0.0) > 0:
+            step, pow10 = spec.lot_sz_d, spec.lot_pow10
+        else:
+            step, pow10 = 1.0, 0
+        floor_to_step = self._floor_to_step
 
-        return float(sz)
+        for i, px in enumerate(prices):
+            one_contract_notional = px * ct_val
+            if one_contract_notional <= 0:
+                continue
+            sz = floor_to_step(risk_notional / one_contract_notional, step, pow10)
+            if min_sz > 0 and sz + 1e-12 < min_sz:
+                continue
+            sizes[i] = float(sz)
+        return sizes
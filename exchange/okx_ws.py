@@ -7,14 +7,15 @@ OKX Public WebSocket
 - HTTP proxy support (for Windows + VPN/Clash)
 """
 
-import json
+import logging
 import os
 import threading
-import time
 from typing import Callable, Optional
 
 import websocket
 
+from utils.fastjson import dumps as json_dumps, loads as json_loads
+from utils.affinity import cpu_from_env, pin_current_thread
 from utils.logger import get_logger
 from utils.proxy import parse_http_proxy
 
@@ -31,21 +32,30 @@ class OKXPublicWS:
         ping_interval: int = 15,
         reconnect_delay: int = 3,
         proxy_url: str = "",
+        on_candles: Optional[Callable[[list], None]] = None,
     ):
         self.url = url
         self.inst_id = inst_id
         self.bar = bar
         self.on_candle = on_candle
+        # 可选的批量回调：一帧多行时整批交给调用方，优先于逐行 on_candle
+        self.on_candles = on_candles
+        # inst_id / bar 生命周期内不变：订阅帧只序列化一次，重连直接复用
+        self._sub_frame = json_dumps({
+            "op": "subscribe",
+            "args": [{"channel": f"candle{bar}", "instId": inst_id}],
+        })
 
         self.ping_interval = ping_interval
         self.reconnect_delay = reconnect_delay
 
         # HTTP proxy（WS 只推荐这个）
         self.proxy_url = (proxy_url or os.getenv("PROXY_URL", "")).strip()
+        self._proxy_parsed = parse_http_proxy(self.proxy_url)
+        self._log_extra = {"inst": inst_id}
 
         self._ws: Optional[websocket.WebSocketApp] = None
         self._thread: Optional[threading.Thread] = None
-        self._ping_thread: Optional[threading.Thread] = None
 
         self._stop = threading.Event()
         self._connected = threading.Event()
@@ -70,7 +80,16 @@ class OKXPublicWS:
 
     # ---------------- internal ----------------
 
+    def _ping_timeout(self) -> Optional[int]:
+        # 心跳走 run_forever 自带的 RFC6455 ping 控制帧（与私有 WS 一致），不再单开线程发 "ping"
+        # websocket-client 要求 ping_timeout < ping_interval
+        return min(10, self.ping_interval - 1) if self.ping_interval > 1 else None
+
     def _run_loop(self):
+        # 可选：把 K 线接收线程绑核（env OKX_WS_CPU），降低调度抖动
+        cpu = cpu_from_env("OKX_WS_CPU")
+        if pin_current_thread(cpu):
+            log.info("Public WS thread pinned", extra={"cpu": cpu})
         while not self._stop.is_set():
             try:
                 self._connected.clear()
@@ -84,7 +103,7 @@ class OKXPublicWS:
                 )
 
                 # === WS run_forever（代理/非代理） ===
-                ph = parse_http_proxy(self.proxy_url)
+                ph = self._proxy_parsed
                 if ph:
                     host, port, auth = ph
                     kwargs = {
@@ -103,43 +122,35 @@ class OKXPublicWS:
                     )
 
                     self._ws.run_forever(
-                        ping_interval=None,
-                        ping_timeout=None,
+                        ping_interval=self.ping_interval,
+                        ping_timeout=self._ping_timeout(),
                         reconnect=0,
+                        skip_utf8_validation=True,
                         **kwargs,
                     )
                 else:
                     self._ws.run_forever(
-                        ping_interval=None,
-                        ping_timeout=None,
+                        ping_interval=self.ping_interval,
+                        ping_timeout=self._ping_timeout(),
                         reconnect=0,
+                        # 与私有 WS 一致：不做逐帧纯 Python UTF-8 校验，坏帧由 json 解码丢弃
+                        skip_utf8_validation=True,
                     )
 
             except Exception as e:
                 log.exception("Public WS loop exception", extra={"err": str(e)})
 
-            if not self._stop.is_set():
-                time.sleep(self.reconnect_delay)
+            # stop() 能立即打断重连等待
+            if self._stop.wait(self.reconnect_delay):
+                break
 
     # ---------------- callbacks ----------------
 
     def _on_open(self, ws):
         self._connected.set()
-        log.info("Public WS connected", extra={"inst": self.inst_id})
+        log.info("Public WS connected", extra=self._log_extra)
 
-        channel = f"candle{self.bar}"
-        sub = {
-            "op": "subscribe",
-            "args": [{"channel": channel, "instId": self.inst_id}],
-        }
-        ws.send(json.dumps(sub))
-
-        # start ping thread
-        if not self._ping_thread or not self._ping_thread.is_alive():
-            self._ping_thread = threading.Thread(
-                target=self._ping_loop, daemon=True
-            )
-            self._ping_thread.start()
+        ws.send(self._sub_frame)
 
     def _on_close(self, ws, code, msg):
         self._connected.clear()
@@ -151,35 +162,35 @@ class OKXPublicWS:
         self._connected.clear()
         log.error("Public WS error", extra={"err": str(err)})
 
-    def _ping_loop(self):
-        while not self._stop.is_set():
-            if self._ws and self.is_connected():
-                try:
-                    self._ws.send("ping")
-                except Exception:
-                    pass
-            time.sleep(self.ping_interval)
-
-    def _on_message(self, ws, message: str):
-        if message == "pong":
+    def _on_message(self, ws, message: bytes):
+        # skip_utf8_validation=True 时 websocket-client 把文本帧按 bytes 原样交过来
+        if message == b"pong":
+            return
+        # 先按原始字节分流：既无 data 也无 event 的帧（心跳/未知）不值得解析
+        if b'"data"' not in message and b'"event"' not in message:
             return
 
         try:
-            obj = json.loads(message)
+            obj = json_loads(message)
         except Exception:
             return
 
-        # subscribe ack / error
-        if isinstance(obj, dict) and obj.get("event"):
-            if obj.get("event") == "subscribe":
-                log.info("Public WS subscribed", extra=obj.get("arg"))
-            elif obj.get("event") == "error":
-                log.error("Public WS subscribe error", extra=obj)
+        if type(obj) is not dict:
             return
 
-        # candle data
-        if isinstance(obj, dict) and "data" in obj:
-            data = obj.get("data") or []
+        # candle data（最常见，先判断）
+        data = obj.get("data")
+        if data is not None:
+            if not data:
+                return
+            if self.on_candles is not None:
+                try:
+                    self.on_candles(data)
+                except Exception as e:
+                    log.warning(
+                        "on_candles failed", extra={"err": str(e)}
+                    )
+                return
             for row in data:
                 try:
                     self.on_candle(row)
@@ -187,3 +198,12 @@ class OKXPublicWS:
                     log.warning(
                         "on_candle failed", extra={"err": str(e)}
                     )
+            return
+
+        # subscribe ack / error
+        event = obj.get("event")
+        if event == "subscribe":
+            if log.isEnabledFor(logging.INFO):
+                log.info("Public WS subscribed", extra=obj.get("arg"))
+        elif event == "error":
+            log.error("Public WS subscribe error", extra=obj)
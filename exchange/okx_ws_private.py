@@ -15,22 +15,26 @@ Other stability features:
 from __future__ import annotations
 
 import base64
+import functools
 import hashlib
 import hmac
-import json
+import logging
 import threading
 import time
-from typing import Any, Dict, Optional, Callable
+from typing import Any, Dict, Optional, Callable, Tuple
 from urllib.parse import urlparse, urlencode, parse_qs, urlunparse
 
 import websocket
 
+from utils.fastjson import dumps as json_dumps, loads as json_loads
 from utils.logger import get_logger
 
 log = get_logger()
 
 
-def _parse_proxy(proxy_url: str) -> Optional[Dict[str, Any]]:
+@functools.lru_cache(maxsize=8)
+def _parse_proxy(proxy_url: str) -> Optional[Tuple[str, str, int]]:
+    """-> (proxy_type, host, port)；返回 tuple 以便缓存共享（不可变）。"""
     if not proxy_url:
         return None
     u = urlparse(proxy_url.strip())
@@ -43,7 +47,7 @@ def _parse_proxy(proxy_url: str) -> Optional[Dict[str, Any]]:
         scheme = "http"
     if scheme not in ("http", "socks4", "socks5"):
         scheme = "http"
-    return {"type": scheme, "host": host, "port": int(port)}
+    return scheme, host, int(port)
 
 
 def _ensure_demo_broker_id(ws_url: str) -> str:
@@ -63,6 +67,7 @@ def _ensure_demo_broker_id(ws_url: str) -> str:
     return ws_url
 
 
+@functools.lru_cache(maxsize=16)
 def _infer_demo_ws_host_from_base_url(base_url_demo: str) -> str:
     """
     Infer demo WS host from REST base url domain.
@@ -76,6 +81,7 @@ def _infer_demo_ws_host_from_base_url(base_url_demo: str) -> str:
     return "wspap.okx.com"
 
 
+@functools.lru_cache(maxsize=16)
 def _infer_prod_ws_host_from_base_url(base_url_prod: str) -> str:
     h = (urlparse(base_url_prod or "").hostname or "").lower()
     if "eea." in h:
@@ -85,6 +91,16 @@ def _infer_prod_ws_host_from_base_url(base_url_prod: str) -> str:
     return "ws.okx.com"
 
 
+# OKX WS login prehash: f"{ts}GET/users/self/verify"
+_VERIFY_SUFFIX = b"GET/users/self/verify"
+
+_PRIVATE_SUBS = (
+    {"channel": "account"},
+    {"channel": "positions", "instType": "SWAP"},
+    {"channel": "orders", "instType": "SWAP"},
+)
+
+
 class OKXPrivateWS:
     def __init__(self, cfg: dict, store, on_event: Optional[Callable[[Dict[str, Any]], None]] = None):
         self.cfg = cfg or {}
@@ -111,17 +127,22 @@ class OKXPrivateWS:
                 url = f"wss://{host}:8443/ws/v5/private"
 
         self.url = url
+        self._log_extra = {"url": url}
 
         # Auth
         auth = self.cfg.get("auth") or {}
         self.api_key = str(auth.get("api_key", "")).strip()
         self.api_secret = str(auth.get("api_secret", "")).strip()
         self.passphrase = str(auth.get("passphrase", "")).strip()
+        # 密钥只编码一次；每次登录 copy() 预置好 key 的 HMAC 状态
+        self._hmac_template = hmac.new(self.api_secret.encode("utf-8"), b"", hashlib.sha256)
 
         # Proxy
         p_cfg = self.cfg.get("proxy") or {}
         self.proxy_enabled = bool(p_cfg.get("enabled", False))
         self.proxy_url = str(p_cfg.get("url", "")).strip() if self.proxy_enabled else ""
+        # 代理只解析一次，重连直接复用
+        self._proxy_parsed = _parse_proxy(self.proxy_url) if self.proxy_url else None
 
         # Reconnect & ping
         self.ping_interval = int(env.get("ws_ping_interval_sec", 15) or 15)
@@ -133,12 +154,16 @@ class OKXPrivateWS:
         self.disabled = False
         self.last_error: str = ""
 
+        # 订阅帧固定不变，构造时序列化一次
+        self._sub_frames = [(sub, json_dumps({"op": "subscribe", "args": [sub]})) for sub in _PRIVATE_SUBS]
+
         self._ws: Optional[websocket.WebSocketApp] = None
         self._th: Optional[threading.Thread] = None
         self._stop = threading.Event()
-        self._connected = False
-        self._authed = False
-        self._subscribed = False
+        # 跨线程读写的状态用 Event：主循环 is_ready() 无锁读取
+        self._connected = threading.Event()
+        self._authed = threading.Event()
+        self._subscribed = threading.Event()
 
     def start(self) -> None:
         if self.disabled:
@@ -159,7 +184,7 @@ class OKXPrivateWS:
             pass
 
     def is_ready(self) -> bool:
-        return bool(self._connected and self._authed and not self.disabled)
+        return self._connected.is_set() and self._authed.is_set() and not self.disabled
 
     def _run_loop(self) -> None:
         while not self._stop.is_set():
@@ -173,52 +198,56 @@ class OKXPrivateWS:
 
             if self._stop.is_set() or self.disabled:
                 return
-            time.sleep(self.reconnect_delay)
+            # stop() 能立即打断重连等待
+            if self._stop.wait(self.reconnect_delay):
+                return
 
     def _connect_once(self) -> None:
-        self._connected = False
-        self._authed = False
-        self._subscribed = False
-
-        def _on_open(ws):
-            self._connected = True
-            log.info("Private WS connected", extra={"url": self.url})
-            self._login()
-
-        def _on_message(ws, message: str):
-            self._handle_message(message)
-
-        def _on_error(ws, err):
-            self.last_error = str(err)
-            log.error("Private WS error", extra={"err": self.last_error})
-
-        def _on_close(ws, code, msg):
-            log.warning("Private WS closed", extra={"code": code, "msg": msg})
-            self._connected = False
-            self._authed = False
+        self._connected.clear()
+        self._authed.clear()
+        self._subscribed.clear()
 
         self._ws = websocket.WebSocketApp(
             self.url,
-            on_open=_on_open,
-            on_message=_on_message,
-            on_error=_on_error,
-            on_close=_on_close,
+            on_open=self._on_open,
+            on_message=self._on_message,
+            on_error=self._on_error,
+            on_close=self._on_close,
         )
 
-        run_kwargs = {"ping_interval": self.ping_interval, "ping_timeout": 10}
+        # OKX 走 TLS，文本帧由 json 解码兜底：跳过 websocket-client 逐帧的纯 Python UTF-8 校验
+        run_kwargs = {"ping_interval": self.ping_interval, "ping_timeout": 10, "skip_utf8_validation": True}
 
-        if self.proxy_enabled and self.proxy_url:
-            ph = _parse_proxy(self.proxy_url)
-            if ph:
-                log.info("Private WS using HTTP proxy", extra={"host": ph["host"], "port": ph["port"], "type": ph["type"]})
-                run_kwargs.update({
-                    "http_proxy_host": ph["host"],
-                    "http_proxy_port": ph["port"],
-                    "proxy_type": ph["type"],
-                })
+        ph = self._proxy_parsed
+        if ph:
+            p_type, p_host, p_port = ph
+            log.info("Private WS using HTTP proxy", extra={"host": p_host, "port": p_port, "type": p_type})
+            run_kwargs.update({
+                "http_proxy_host": p_host,
+                "http_proxy_port": p_port,
+                "proxy_type": p_type,
+            })
 
         self._ws.run_forever(**run_kwargs)
 
+    # 回调用绑定方法，重连时不再每次创建闭包
+    def _on_open(self, ws) -> None:
+        self._connected.set()
+        log.info("Private WS connected", extra=self._log_extra)
+        self._login()
+
+    def _on_message(self, ws, message: bytes) -> None:
+        self._handle_message(message)
+
+    def _on_error(self, ws, err) -> None:
+        self.last_error = str(err)
+        log.error("Private WS error", extra={"err": self.last_error})
+
+    def _on_close(self, ws, code, msg) -> None:
+        log.warning("Private WS closed", extra={"code": code, "msg": msg})
+        self._connected.clear()
+        self._authed.clear()
+
     def _login(self) -> None:
         if not self._ws:
             return
@@ -226,49 +255,46 @@ class OKXPrivateWS:
             self._disable("Missing API credentials (auth.api_key/api_secret/passphrase)")
             return
 
-        # OKX WS login prehash: f"{ts}GET/users/self/verify"
-        ts = str(int(time.time()))
-        prehash = f"{ts}GET/users/self/verify"
-        mac = hmac.new(self.api_secret.encode("utf-8"), prehash.encode("utf-8"), hashlib.sha256)
-        sign = base64.b64encode(mac.digest()).decode("utf-8")
+        ts_b = b"%d" % (time.time_ns() // 1_000_000_000)
+        mac = self._hmac_template.copy()
+        mac.update(ts_b)
+        mac.update(_VERIFY_SUFFIX)
+        sign = base64.b64encode(mac.digest()).decode("ascii")
 
         payload = {
             "op": "login",
             "args": [{
                 "apiKey": self.api_key,
                 "passphrase": self.passphrase,
-                "timestamp": ts,
+                "timestamp": ts_b.decode("ascii"),
                 "sign": sign
             }]
         }
         try:
-            self._ws.send(json.dumps(payload))
+            self._ws.send(json_dumps(payload))
         except Exception as e:
             self.last_error = str(e)
             log.error("Private WS send login failed", extra={"err": self.last_error})
 
     def _subscribe_after_login(self) -> None:
-        if not self._ws or self._subscribed:
+        if not self._ws or self._subscribed.is_set():
             return
 
-        subs = [
-            {"channel": "account"},
-            {"channel": "positions", "instType": "SWAP"},
-            {"channel": "orders", "instType": "SWAP"},
-        ]
-        for s in subs:
-            payload = {"op": "subscribe", "args": [s]}
+        info = log.isEnabledFor(logging.INFO)
+        for s, frame in self._sub_frames:
             try:
-                self._ws.send(json.dumps(payload))
-                log.info("Private WS subscribed", extra=s)
+                self._ws.send(frame)
+                if info:
+                    log.info("Private WS subscribed", extra=s)
             except Exception as e:
                 log.error("Private WS subscribe send failed", extra={"err": str(e), "sub": s})
 
-        self._subscribed = True
+        self._subscribed.set()
 
-    def _handle_message(self, message: str) -> None:
+    def _handle_message(self, message: bytes) -> None:
+        # skip_utf8_validation=True：帧是 bytes，json_loads 直接吃 bytes
         try:
-            msg = json.loads(message)
+            msg = json_loads(message)
         except Exception:
             return
 
@@ -282,9 +308,10 @@ class OKXPrivateWS:
         if ev == "login":
             code = str(msg.get("code") or "")
             if code == "0":
-                self._authed = True
+                self._authed.set()
                 self._login_failures = 0
-                log.info("Private WS login ok", extra={})
+                if log.isEnabledFor(logging.INFO):
+                    log.info("Private WS login ok")
                 self._subscribe_after_login()
             else:
                 self._login_failures += 1
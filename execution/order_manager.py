@@ -9,33 +9,128 @@ Stability upgrades:
   - timeout -> query with get_order_anywhere()
   - not found -> mark done & cleanup (avoid infinite timeout loop)
 - After fill -> place TP/SL algo with idempotency guard
+
+数值约定：本模块全程 float 计算；张数/价格的步长取整与 Decimal 只在 exchange 层
+（OKXRest._floor_to_step/_fmt_sz），这里只在落库时格式化成定点字符串。
 """
 
 from __future__ import annotations
 
+import base64
 import hashlib
+from logging import INFO, WARNING
+import queue
+import threading
 import time
-from decimal import Decimal, ROUND_DOWN
+from collections import namedtuple
 from typing import Any, Dict, Optional, Tuple
 
 from utils.logger import get_logger
 
 log = get_logger()
+_log_enabled = log.isEnabledFor
+
+
+def _kv_float(v: Optional[str]) -> float:
+    try:
+        return float(v) if v else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# _bar_close 在 "close" 缺失/非法时依次尝试的字段
+_CLOSE_FALLBACK_KEYS = ("c", "last", "px")
+
+# 热路径要用的配置，reload_cfg 时一次性解析成基本类型
+_TradeCfg = namedtuple(
+    "_TradeCfg",
+    "inst_id td_mode reject_cd cooldown max_pos timeout_sec cancel_on_timeout min_avail buffer_ratio lev",
+)
+
+
+def _parse_trade_cfg(cfg: dict) -> _TradeCfg:
+    trade = cfg.get("trade") or {}
+    account = cfg.get("account") or {}
+    lev = float(account.get("leverage", 1) or 1)
+    return _TradeCfg(
+        inst_id=str(trade.get("inst_id", "") or "").strip(),
+        td_mode=str(account.get("td_mode", "isolated") or "isolated").strip(),
+        reject_cd=float(trade.get("reject_cooldown_sec", 15) or 15),
+        cooldown=float(trade.get("cooldown_sec", 0) or 0),
+        max_pos=int(trade.get("max_positions", 1) or 1),
+        timeout_sec=float(trade.get("order_timeout_sec", 60) or 60),
+        cancel_on_timeout=bool(trade.get("cancel_on_timeout", True)),
+        min_avail=float(trade.get("min_avail_usdt", 5) or 5),
+        buffer_ratio=float(trade.get("margin_buffer_ratio", 0.95) or 0.95),
+        lev=lev if lev > 0 else 1.0,
+    )
+
+
+# write-behind 队列一次最多合并的操作数
+_WB_BATCH = 64
+
+# OKX clOrdId 只允许字母数字：base64url 的 -/_ 映射成 A/B
+_CL_ORD_ID_TRANS = bytes.maketrans(b"-_", b"AB")
 
 
 def make_cl_ord_id(idempotency_key: str) -> str:
-    h = hashlib.sha1(idempotency_key.encode("utf-8")).hexdigest()[:20]
-    suffix = str(int(time.time() * 1000) % 100000).zfill(5)
-    return f"Q{h}{suffix}"
+    """"Q" + 128-bit blake2b 的 base64url（22 字符），共 23 字符，低于 OKX 32 字符上限。"""
+    d = hashlib.blake2b(idempotency_key.encode("utf-8"), digest_size=16).digest()
+    return "Q" + base64.urlsafe_b64encode(d)[:22].translate(_CL_ORD_ID_TRANS).decode("ascii")
 
 
 class OrderManager:
+    __slots__ = (
+        "ex", "store", "cfg", "portfolio", "risk",
+        "_tcfg", "_last_reject_mono", "_last_trade_mono", "_kv_dirty", "_ct_val",
+        "_pending", "_ws_terminal",
+        "_wb_queue", "_wb_thread", "_tp_sl_idem",
+    )
+
     def __init__(self, ex, store, cfg: dict, portfolio, risk):
         self.ex = ex
         self.store = store
-        self.cfg = cfg or {}
         self.portfolio = portfolio
         self.risk = risk
+        self.cfg = cfg or {}
+        self.reload_cfg()
+
+        # 冷却时间戳放内存（monotonic，不受系统校时影响）；KV 只做持久化，由 housekeep 批量刷盘
+        self._last_reject_mono = float("-inf")
+        self._last_trade_mono = float("-inf")
+        self._kv_dirty: Dict[str, str] = {}
+        self._seed_cooldowns()
+
+        # 当前 pending 放内存，housekeep 无单时不必读 KV；重启时从 KV 恢复一次
+        # (idem, clOrdId, 下单 wall ts) 作为一个元组整体替换：WS 线程读到的三者永远属于同一笔单
+        self._pending: Optional[Tuple[str, Optional[str], float]] = None
+        try:
+            idem = self.store.get_kv("pending_current_idem") or None
+            if idem:
+                kv = self.store.mget((self._pending_key(idem), self._pending_ts_key(idem)))
+                self._pending = (idem, kv[self._pending_key(idem)] or None, _kv_float(kv[self._pending_ts_key(idem)]))
+        except Exception:
+            pass
+        # 私有 WS 线程只把终态推送入队；结算（含挂 TP/SL 的阻塞 REST）统一在主线程 housekeep 里做，
+        # 不占用 WS 读线程，也不需要和 housekeep 的超时查单抢锁
+        self._ws_terminal: "queue.SimpleQueue" = queue.SimpleQueue()
+
+        # pending 的 KV 持久化走 write-behind：下单路径只入队，不等 SQLite 落盘
+        # 队列元素：("set", {k: v}) / ("del", keys) / None(停止)；同一线程按序执行，删除不会跑到写入前面
+        self._wb_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._wb_thread = threading.Thread(target=self._wb_loop, name="OrderManagerKV", daemon=True)
+        self._wb_thread.start()
+        # 最近一次已挂 TP/SL 的 idem：tp_sl_set 走 write-behind，落盘前靠它防重复挂单
+        self._tp_sl_idem: Optional[str] = None
+
+    def reload_cfg(self, cfg: Optional[dict] = None) -> None:
+        """cfg 变更后调用：重新解析 _TradeCfg 快照。"""
+        if cfg is not None:
+            self.cfg = cfg
+        # 整体替换一个不可变快照：WS 线程读到的永远是同一版配置
+        self._tcfg = _parse_trade_cfg(self.cfg)
+        # 合约面值日内不变：首次 _margin_gate 时从 spec 取一次并缓存
+        self._ct_val: Optional[float] = None
 
     # 兼容旧调用名（避免 main.py/strategy 入口不一致）
     def handle_signal(self, signal: Any, bar: Dict[str, Any]) -> None:
@@ -56,6 +151,83 @@ class OrderManager:
     def _reject_ts_key(self) -> str:
         return "last_reject_ts"
 
+    def _seed_cooldowns(self) -> None:
+        """启动时从 KV 恢复冷却起点：墙钟时间差换算到 monotonic。"""
+        try:
+            kv = self.store.mget((self._reject_ts_key(), "last_trade_ts"))
+        except Exception:
+            return
+        now_wall = time.time()
+        now_mono = time.monotonic()
+        ts = _kv_float(kv[self._reject_ts_key()])
+        if ts > 0:
+            self._last_reject_mono = now_mono - (now_wall - ts)
+        ts = _kv_float(kv["last_trade_ts"])
+        if ts > 0:
+            self._last_trade_mono = now_mono - (now_wall - ts)
+
+    def _mark_reject(self, now_mono: Optional[float] = None, now_str: Optional[str] = None) -> None:
+        self._last_reject_mono = time.monotonic() if now_mono is None else now_mono
+        self._kv_dirty[self._reject_ts_key()] = str(time.time()) if now_str is None else now_str
+
+    def _mark_trade(self, now_mono: Optional[float] = None, now_str: Optional[str] = None) -> None:
+        self._last_trade_mono = time.monotonic() if now_mono is None else now_mono
+        self._kv_dirty["last_trade_ts"] = str(time.time()) if now_str is None else now_str
+
+    def _flush_kv(self) -> None:
+        if not self._kv_dirty:
+            return
+        dirty, self._kv_dirty = self._kv_dirty, {}
+        try:
+            self.store.mset(dirty)
+        except Exception as e:
+            log.warning("KV FLUSH FAILED", extra={"err": str(e)})
+
+    def _wb_loop(self) -> None:
+        q = self._wb_queue
+        while True:
+            batch = [q.get()]
+            while len(batch) < _WB_BATCH:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            if not self._wb_apply(batch):
+                return
+
+    def _wb_apply(self, batch) -> bool:
+        """按序执行一批 write-behind 操作；相邻的 set 合并成一次 mset。遇到停止标记返回 False。"""
+        sets: Dict[str, str] = {}
+        running = True
+        for item in batch:
+            if item is None:
+                running = False
+                continue
+            op, arg = item
+            if op == "set":
+                sets.update(arg)
+                continue
+            try:
+                if sets:
+                    self.store.mset(sets)
+                    sets = {}
+                self.store.delete_many(arg)
+            except Exception as e:
+                log.warning("KV WRITE-BEHIND FAILED", extra={"err": str(e)})
+        if sets:
+            try:
+                self.store.mset(sets)
+            except Exception as e:
+                log.warning("KV WRITE-BEHIND FAILED", extra={"err": str(e)})
+        return running
+
+    def close(self, timeout: float = 5.0) -> None:
+        """停机前调用：刷完 write-behind 队列与冷却 KV。"""
+        self._flush_kv()
+        if self._wb_thread.is_alive():
+            self._wb_queue.put(None)
+            self._wb_thread.join(timeout)
+
     # -----------------------------
     # Signal entry
     # -----------------------------
@@ -69,28 +241,39 @@ class OrderManager:
         if not idem:
             return
 
+        # 门禁用到的 KV 一次取回
+        done_key = self._done_key(idem)
+        pending_key = self._pending_key(idem)
+        kv = self.store.mget((done_key, pending_key))
+
         # 已 done 不再处理
-        if self.store.get_kv(self._done_key(idem)) == "1":
+        if kv[done_key] == "1":
             return
 
-        # 已 pending 不再重复下单
-        if self.store.get_kv(self._pending_key(idem)):
+        # 已 pending 不再重复下单（内存优先，KV 兜底）
+        p = self._pending
+        if (p is not None and p[0] == idem) or kv[pending_key]:
             return
 
+        # 整个信号处理用同一版配置快照
+        tc = self._tcfg
+
         # reject 冷却：避免余额不足/权限不足的错误无限刷
-        reject_cd = float((self.cfg.get("trade") or {}).get("reject_cooldown_sec", 15) or 15)
-        last_reject_ts = float(self.store.get_kv_float(self._reject_ts_key()) or 0.0)
-        if reject_cd > 0 and (time.time() - last_reject_ts) < reject_cd:
+        # 时钟只在这里各取一次：冷却判断、pending ts、冷却标记共用
+        reject_cd = tc.reject_cd
+        now = time.monotonic()
+        now_wall = time.time()
+        now_str = str(now_wall)
+        if reject_cd > 0 and (now - self._last_reject_mono) < reject_cd:
             return
 
         # 冷却（正常下单间隔）
-        cooldown = float((self.cfg.get("trade") or {}).get("cooldown_sec", 0) or 0)
-        last_trade_ts = float(self.store.get_kv_float("last_trade_ts") or 0.0)
-        if cooldown > 0 and (time.time() - last_trade_ts) < cooldown:
+        cooldown = tc.cooldown
+        if cooldown > 0 and (now - self._last_trade_mono) < cooldown:
             return
 
-        inst_id = str((self.cfg.get("trade") or {}).get("inst_id", "") or "").strip()
-        td_mode = str((self.cfg.get("account") or {}).get("td_mode", "isolated") or "isolated").strip()
+        inst_id = tc.inst_id
+        td_mode = tc.td_mode
         if not inst_id:
             return
 
@@ -111,7 +294,7 @@ class OrderManager:
         # max_positions=1 语义：禁止同时持有反向仓
         pos_long = float(getattr(self.portfolio, "pos_long", 0.0) or 0.0)
         pos_short = float(getattr(self.portfolio, "pos_short", 0.0) or 0.0)
-        max_pos = int((self.cfg.get("trade") or {}).get("max_positions", 1) or 1)
+        max_pos = tc.max_pos
 
         if max_pos <= 1:
             if action == "OPEN_LONG" and pos_short > 0:
@@ -134,9 +317,9 @@ class OrderManager:
         # 余额/保证金门禁（避免反复 51008）
         if not self._margin_gate(inst_id=inst_id, last_px=entry_px, sz=sz):
             # 标记 reject 冷却，避免狂刷
-            self.store.set_kv(self._reject_ts_key(), str(time.time()))
             # 同一个 idem 可标 done，避免同一根信号无限尝试（你也可以改成不 done 让它下根信号重试）
-            self.store.set_kv(self._done_key(idem), "1")
+            self._mark_reject(now, now_str)
+            self.store.set_kv(done_key, "1")
             return
 
         # TP/SL 方向修复：用 posSide 映射
@@ -145,24 +328,28 @@ class OrderManager:
 
         cl_ord_id = make_cl_ord_id(idem)
 
-        log.info(
-            "PLACE ORDER SUBMIT",
-            extra={
-                "signal": action,
-                "inst": inst_id,
-                "entry": entry_px,
-                "sz": sz,
-                "tp": tp,
-                "sl": sl,
-                "clOrdId": cl_ord_id,
-                "reason": reason,
-            },
-        )
+        if _log_enabled(INFO):
+            log.info(
+                "PLACE ORDER SUBMIT",
+                extra={
+                    "signal": action,
+                    "inst": inst_id,
+                    "entry": entry_px,
+                    "sz": sz,
+                    "tp": tp,
+                    "sl": sl,
+                    "clOrdId": cl_ord_id,
+                    "reason": reason,
+                },
+            )
 
-        # 写入 pending
-        self.store.set_kv("pending_current_idem", idem)
-        self.store.set_kv(self._pending_key(idem), cl_ord_id)
-        self.store.set_kv(self._pending_ts_key(idem), str(time.time()))
+        # 写入 pending：内存立即生效；KV 只为崩溃恢复，交给 write-behind 线程，与下单 RTT 重叠
+        self._pending = (idem, cl_ord_id, now_wall)
+        self._wb_queue.put(("set", {
+            "pending_current_idem": idem,
+            pending_key: cl_ord_id,
+            self._pending_ts_key(idem): now_str,
+        }))
 
         # 下单：必须 catch，不能把主循环炸掉
         try:
@@ -179,10 +366,9 @@ class OrderManager:
             log.error("PLACE ORDER FAILED", extra={"err": str(e), "clOrdId": cl_ord_id})
             # 清理 pending，防止 timeout 死循环
             self._cleanup_pending(idem)
-            # 记录 reject 冷却
-            self.store.set_kv(self._reject_ts_key(), str(time.time()))
-            # 该信号标 done，避免同一 idem 无限重试
-            self.store.set_kv(self._done_key(idem), "1")
+            # 记录 reject 冷却；该信号标 done，避免同一 idem 无限重试
+            self._mark_reject(now, now_str)
+            self.store.set_kv(done_key, "1")
             return
 
         # 入库（可选）
@@ -191,7 +377,7 @@ class OrderManager:
                 inst_id=inst_id,
                 side=side,
                 pos_side=pos_side,
-                sz=str(sz),
+                sz=f"{sz:.8f}",  # 定点格式，避免 str(float) 出现 1e-05
                 tp_trigger=tp,
                 sl_trigger=sl,
                 resp_json=resp,
@@ -201,41 +387,74 @@ class OrderManager:
         except Exception as e:
             log.warning("SAVE ORDER FAILED", extra={"err": str(e)})
 
-        self.store.set_kv("last_trade_ts", str(time.time()))
+        self._mark_trade(now, now_str)
 
     # -----------------------------
     # Housekeeping
     # -----------------------------
     def housekeep(self) -> None:
-        idem = self.store.get_kv("pending_current_idem")
-        if not idem:
+        self._flush_kv()
+
+        # 先收 WS 推来的终态：只认当前 pending 的 clOrdId，旧单/已结算单的推送直接丢弃
+        hit = None
+        p = self._pending
+        while True:
+            try:
+                order = self._ws_terminal.get_nowait()
+            except queue.Empty:
+                break
+            if p is not None and order.get("clOrdId") == p[1]:
+                hit = order
+
+        if p is None:
             return
 
-        if self.store.get_kv(self._done_key(idem)) == "1":
+        if hit is not None:
+            state = (hit.get("state") or "").lower()
+            self._settle_terminal(p[0], p[1], state, hit)
+            log.warning("ORDER DONE ON WS", extra={"clOrdId": p[1], "state": state})
+            return
+
+        self._check_pending(p[0])
+
+    def _check_pending(self, idem: str) -> None:
+        tc = self._tcfg
+        done_key = self._done_key(idem)
+        p = self._pending
+        if p is not None and p[0] == idem and p[1]:
+            # 内存里的 pending（write-behind 可能还没落盘）
+            _, cl, ts = p
+            done = self.store.get_kv(done_key)
+        else:
+            pending_key = self._pending_key(idem)
+            pending_ts_key = self._pending_ts_key(idem)
+            kv = self.store.mget((done_key, pending_key, pending_ts_key))
+            done, cl, ts = kv[done_key], kv[pending_key], _kv_float(kv[pending_ts_key])
+
+        if done == "1":
             self._cleanup_pending(idem)
             return
 
-        cl = self.store.get_kv(self._pending_key(idem))
         if not cl:
             self._cleanup_pending(idem)
             return
 
-        ts = float(self.store.get_kv_float(self._pending_ts_key(idem)) or 0.0)
         if ts <= 0:
             return
 
-        timeout_sec = float((self.cfg.get("trade") or {}).get("order_timeout_sec", 60) or 60)
+        timeout_sec = tc.timeout_sec
         if (time.time() - ts) < timeout_sec:
             return
 
-        inst_id = str((self.cfg.get("trade") or {}).get("inst_id", "") or "").strip()
-        td_mode = str((self.cfg.get("account") or {}).get("td_mode", "isolated") or "isolated").strip()
+        inst_id = tc.inst_id
+        td_mode = tc.td_mode
 
         log.warning("ORDER TIMEOUT CHECK", extra={"idem": idem, "clOrdId": cl, "timeoutSec": timeout_sec})
 
         # timeout 查单：必须用 get_order_anywhere（51603/历史翻页兜底）
         try:
-            od = self.ex.get_order_anywhere(inst_id=inst_id, cl_ord_id=cl)
+            # 传下单时间：历史查询只扫该时间窗口
+            od = self.ex.get_order_anywhere(inst_id=inst_id, cl_ord_id=cl, created_ts_ms=int(ts * 1000))
             info = (od.get("data") or [{}])[0]
             state = (info.get("state") or "").lower()
             acc_fill = float(info.get("accFillSz") or 0.0)
@@ -247,20 +466,12 @@ class OrderManager:
             self._cleanup_pending(idem)
             return
 
-        log.warning("ORDER STATUS ON TIMEOUT", extra={"clOrdId": cl, "state": state, "accFillSz": acc_fill})
+        if _log_enabled(WARNING):
+            log.warning("ORDER STATUS ON TIMEOUT", extra={"clOrdId": cl, "state": state, "accFillSz": acc_fill})
 
         # 终态处理
         if state in ("filled", "canceled"):
-            if state == "filled":
-                self._after_fill_set_tp_sl(
-                    idem=idem,
-                    inst_id=inst_id,
-                    td_mode=td_mode,
-                    cl_ord_id=cl,
-                    info=info,
-                )
-            self.store.set_kv(self._done_key(idem), "1")
-            self._cleanup_pending(idem)
+            self._settle_terminal(idem, cl, state, info)
             log.warning("ORDER DONE ON QUERY", extra={"clOrdId": cl, "state": state})
             return
 
@@ -286,14 +497,42 @@ class OrderManager:
             return
 
         # 仍然 live：按配置撤单
-        cancel_on_timeout = bool((self.cfg.get("trade") or {}).get("cancel_on_timeout", True))
-        if cancel_on_timeout:
+        if tc.cancel_on_timeout:
             try:
                 self.ex.cancel_order(inst_id=inst_id, cl_ord_id=cl)
                 log.warning("ORDER CANCELED ON TIMEOUT", extra={"clOrdId": cl})
             except Exception as e:
                 log.error("CANCEL FAILED", extra={"clOrdId": cl, "err": str(e)})
 
+    def _settle_terminal(self, idem: str, cl: str, state: str, info: Dict[str, Any]) -> None:
+        """filled / canceled：成交则挂 TP/SL，然后 done + 清理 pending。"""
+        if state == "filled":
+            tc = self._tcfg
+            self._after_fill_set_tp_sl(
+                idem=idem,
+                inst_id=tc.inst_id,
+                td_mode=tc.td_mode,
+                cl_ord_id=cl,
+                info=info,
+            )
+        self.store.set_kv(self._done_key(idem), "1")
+        self._cleanup_pending(idem)
+
+    def on_ws_order(self, order: Dict[str, Any]) -> None:
+        """私有 WS orders 频道推送（WS 读线程）：当前 pending 单到终态时入队，下一次 housekeep 结算，
+        不必等超时查单。这里不做任何 REST，避免阻塞读线程导致 ping 超时断线。
+
+        partially_filled 只是市价单的中间态，仍交给 housekeep 超时兜底。
+        """
+        cl = order.get("clOrdId")
+        p = self._pending
+        if not cl or p is None or cl != p[1]:
+            return
+        state = (order.get("state") or "").lower()
+        if state not in ("filled", "canceled"):
+            return
+        self._ws_terminal.put(order)
+
     # -----------------------------
     # TP/SL after fill
     # -----------------------------
@@ -306,8 +545,9 @@ class OrderManager:
         info: Dict[str, Any],
         force_sz: Optional[float] = None,
     ) -> None:
-        # 幂等：避免重复挂
-        if self.store.get_kv(f"tp_sl_set:{idem}") == "1":
+        # 幂等：避免重复挂（内存优先，KV 兜底）
+        tp_sl_key = f"tp_sl_set:{idem}"
+        if idem == self._tp_sl_idem or self.store.get_kv(tp_sl_key) == "1":
             return
 
         try:
@@ -342,19 +582,23 @@ class OrderManager:
                 cl_ord_id=algo_cl,
             )
 
-            self.store.set_kv(f"tp_sl_set:{idem}", "1")
-            log.warning(
-                "TP/SL SET AFTER FILL",
-                extra={
-                    "clOrdId": cl_ord_id,
-                    "algoClOrdId": algo_cl,
-                    "avgPx": avg_px,
-                    "sz": sz,
-                    "posSide": pos_side,
-                    "tp": tp_px,
-                    "sl": sl_px,
-                },
-            )
+            # 标记交给 write-behind 线程，TP/SL 路径只付 REST 的延迟；
+            # 崩溃丢标记也无妨：algoClOrdId 由 clOrdId 确定，交易所侧同样幂等
+            self._tp_sl_idem = idem
+            self._wb_queue.put(("set", {tp_sl_key: "1"}))
+            if _log_enabled(WARNING):
+                log.warning(
+                    "TP/SL SET AFTER FILL",
+                    extra={
+                        "clOrdId": cl_ord_id,
+                        "algoClOrdId": algo_cl,
+                        "avgPx": avg_px,
+                        "sz": sz,
+                        "posSide": pos_side,
+                        "tp": tp_px,
+                        "sl": sl_px,
+                    },
+                )
         except Exception as e:
             log.error("SET TP/SL FAILED", extra={"clOrdId": cl_ord_id, "err": str(e)})
 
@@ -375,72 +619,78 @@ class OrderManager:
             log.warning("BLOCK ORDER: avail_usdt <= 0", extra={"avail_usdt": avail})
             return False
 
-        lev = float((self.cfg.get("account") or {}).get("leverage", 1) or 1)
-        if lev <= 0:
-            lev = 1.0
+        tc = self._tcfg
+        ct_val = self._ct_val if inst_id == tc.inst_id else None
+        if ct_val is None:
+            ct_val = self._lookup_ct_val(inst_id)
+            if ct_val and inst_id == tc.inst_id:
+                self._ct_val = ct_val
 
-        ct_val = None
-        try:
-            # 使用 OKXRest 内部 spec cache（若存在）
-            if hasattr(self.ex, "_must_spec"):
-                spec = self.ex._must_spec(inst_id)
-                ct_val = float(getattr(spec, "ct_val", 0.0) or 0.0)
-        except Exception:
-            ct_val = None
-
-        if not ct_val or ct_val <= 0:
+        if not ct_val:
             # 拿不到合约规格，只做最低限度拦截
-            min_avail = float((self.cfg.get("trade") or {}).get("min_avail_usdt", 5) or 5)
+            min_avail = tc.min_avail
             if avail < min_avail:
                 log.warning("BLOCK ORDER: low avail_usdt", extra={"avail_usdt": avail, "min_avail_usdt": min_avail})
                 return False
             return True
 
-        notional = float(last_px) * float(ct_val) * float(sz)
+        lev = tc.lev
+        notional = float(last_px) * ct_val * float(sz)
         req_margin = notional / lev
 
-        # 留一点 buffer，避免手续费/浮动
-        buffer_ratio = float((self.cfg.get("trade") or {}).get("margin_buffer_ratio", 0.95) or 0.95)
+        # 留一点 buffer，避免手续费/浮动；常见情况余额充足，直接放行
+        buffer_ratio = tc.buffer_ratio
+        if req_margin <= avail * buffer_ratio:
+            return True
 
-        if req_margin > avail * buffer_ratio:
-            log.warning(
-                "BLOCK ORDER: insufficient margin",
-                extra={
-                    "avail_usdt": avail,
-                    "est_notional": notional,
-                    "est_req_margin": req_margin,
-                    "leverage": lev,
-                    "buffer_ratio": buffer_ratio,
-                },
-            )
-            return False
+        log.warning(
+            "BLOCK ORDER: insufficient margin",
+            extra={
+                "avail_usdt": avail,
+                "est_notional": notional,
+                "est_req_margin": req_margin,
+                "leverage": lev,
+                "buffer_ratio": buffer_ratio,
+            },
+        )
+        return False
 
-        return True
+    def _lookup_ct_val(self, inst_id: str) -> Optional[float]:
+        try:
+            # 使用 OKXRest 内部 spec cache（若存在）
+            if hasattr(self.ex, "_must_spec"):
+                spec = self.ex._must_spec(inst_id)
+                ct_val = float(getattr(spec, "ct_val", 0.0) or 0.0)
+                return ct_val if ct_val > 0 else None
+        except Exception:
+            pass
+        return None
 
     # -----------------------------
     # Cleanup + utils
     # -----------------------------
     def _cleanup_pending(self, idem: str) -> None:
-        try:
-            self.store.del_kv("pending_current_idem")
-        except Exception:
-            pass
-        try:
-            self.store.del_kv(self._pending_key(idem))
-        except Exception:
-            pass
-        try:
-            self.store.del_kv(self._pending_ts_key(idem))
-        except Exception:
-            pass
+        p = self._pending
+        if p is not None and p[0] == idem:
+            self._pending = None
+        # 与 pending 写入同走 write-behind 队列，保证删除在写入之后执行
+        self._wb_queue.put(("del", ("pending_current_idem", self._pending_key(idem), self._pending_ts_key(idem))))
 
     def _bar_close(self, bar: Dict[str, Any]) -> float:
         if not isinstance(bar, dict):
             return 0.0
-        for k in ("close", "c", "last", "px"):
-            if k in bar and bar[k] is not None:
+        # main 传入的 bar 总带 "close"：先走这一次查找
+        v = bar.get("close")
+        if v is not None:
+            try:
+                return float(v)
+            except (TypeError, ValueError):
+                pass
+        for k in _CLOSE_FALLBACK_KEYS:
+            v = bar.get(k)
+            if v is not None:
                 try:
-                    return float(bar[k])
-                except Exception:
+                    return float(v)
+                except (TypeError, ValueError):
                     continue
         return 0.0
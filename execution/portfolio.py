@@ -6,9 +6,8 @@
 2) 由于历史版本 Portfolio 构造参数顺序不一致，导致 self.ex/self.store/self.cfg 被错位。
 
 本文件做了“防呆”：
-- __init__ 支持两种调用方式：
-  - Portfolio(ex, store, cfg)   (旧main)
-  - Portfolio(cfg, ex, store)   (更直观的新main)
+- 构造签名固定为 Portfolio(ex, store, cfg)；
+  cfg 在前的旧调用方式改用 Portfolio.from_legacy_cfg_first(cfg, ex, store)
 - 刷新账户/持仓时都做了严格类型检查与兜底。
 
 输出字段（供 OrderManager 使用）：
@@ -19,34 +18,42 @@
 
 from __future__ import annotations
 
-import json
 import time
+from operator import itemgetter
 from typing import Any, Dict, List, Optional
 
+from utils.fastjson import loads as json_loads
 from utils.logger import get_logger
 
 log = get_logger()
 
+_side_and_pos = itemgetter("posSide", "pos")
+
 
 class Portfolio:
-    def __init__(self, a, b, c):
-        """支持两种参数顺序：
-        - (ex, store, cfg)
-        - (cfg, ex, store)
-        """
-        if isinstance(a, dict):
-            self.cfg = a
-            self.ex = b
-            self.store = c
-        elif isinstance(c, dict):
-            self.ex = a
-            self.store = b
-            self.cfg = c
-        else:
+    __slots__ = (
+        "ex", "store", "cfg", "_inst_id",
+        "equity", "avail_usdt",
+        "pos_long", "pos_short",
+        "has_position", "pos_side", "pos_sz",
+        "_ws_fresh_val", "_ws_fresh_until",
+    )
+
+    def __init__(self, ex, store, cfg: dict):
+        if not isinstance(cfg, dict):
             raise TypeError(
-                "Portfolio expects (ex, store, cfg) or (cfg, ex, store); got types: "
-                f"{type(a)=}, {type(b)=}, {type(c)=}"
+                "Portfolio expects (ex, store, cfg); use Portfolio.from_legacy_cfg_first(cfg, ex, store) "
+                f"for the old order. got {type(cfg)=}"
             )
+        self.ex = ex
+        self.store = store
+        self.cfg = cfg
+
+        self._inst_id: str = str((self.cfg.get("trade") or {}).get("inst_id") or "").strip()
+
+        # _ws_fresh 的结果缓存到 monotonic 截止时间，截止前不再读 KV
+        self._ws_fresh_val: bool = False
+        self._ws_fresh_until: float = float("-inf")
 
         # Account
         self.equity: float = 0.0
@@ -61,13 +68,20 @@ class Portfolio:
         self.pos_side: Optional[str] = None  # "long"/"short"/None
         self.pos_sz: float = 0.0
 
+    @classmethod
+    def from_legacy_cfg_first(cls, cfg: dict, ex, store) -> "Portfolio":
+        """兼容旧的 (cfg, ex, store) 参数顺序。"""
+        return cls(ex, store, cfg)
+
     # -----------------------------
     # Public APIs
     # -----------------------------
 
     def refresh(self) -> None:
-        self._refresh_account()
-        self._refresh_pos()
+        # 一次 refresh 只判断一次 WS 新鲜度
+        fresh = self._ws_fresh()
+        self._refresh_account(fresh)
+        self._refresh_pos(fresh)
 
     def refresh_light(self) -> None:
         # 当前实现与 refresh 相同，预留以后做轻量刷新
@@ -78,19 +92,32 @@ class Portfolio:
     # -----------------------------
 
     def _ws_fresh(self, max_age_sec: float = 5.0) -> bool:
-        """私有WS如果在最近 max_age_sec 内有更新，则优先使用 store 里的快照。"""
+        """私有WS如果在最近 max_age_sec 内有更新，则优先使用 store 里的快照。
+
+        新鲜：在剩余有效期内直接复用；不新鲜：max_age_sec/2 内不再重查 KV。
+        """
+        now_mono = time.monotonic()
+        if now_mono < self._ws_fresh_until:
+            return self._ws_fresh_val
+
+        max_age = float(max_age_sec)
         try:
             ts = self.store.get_kv_float("ws_private:last_uptime")
         except Exception:
-            return False
-        if ts is None:
-            return False
-        return (time.time() - float(ts)) <= float(max_age_sec)
+            ts = None
+        age = (time.time() - float(ts)) if ts is not None else None
+        fresh = age is not None and age <= max_age
 
-    def _refresh_account(self) -> None:
+        self._ws_fresh_val = fresh
+        self._ws_fresh_until = now_mono + ((max_age - age) if fresh else max_age / 2)
+        return fresh
+
+    def _refresh_account(self, fresh: Optional[bool] = None) -> None:
         """刷新 equity / avail_usdt"""
+        if fresh is None:
+            fresh = self._ws_fresh()
         try:
-            if self._ws_fresh():
+            if fresh:
                 ws_eq = self.store.get_kv_float("ws:equity_usd")
                 ws_av = self.store.get_kv_float("ws:avail_usdt")
                 self.equity = float(ws_eq) if ws_eq is not None else float(self.ex.get_account_equity_usd() or 0.0)
@@ -104,15 +131,17 @@ class Portfolio:
             self.equity = float(self.equity or 0.0)
             self.avail_usdt = float(self.avail_usdt or 0.0)
 
-    def _refresh_pos(self) -> None:
+    def _refresh_pos(self, fresh: Optional[bool] = None) -> None:
         """刷新持仓（long_short_mode: long/short 两条）"""
-        inst_id = str((self.cfg.get("trade") or {}).get("inst_id") or "").strip()
+        inst_id = self._inst_id
         if not inst_id:
             self._set_pos(0.0, 0.0)
             return
 
         # WS 快照
-        if self._ws_fresh():
+        if fresh is None:
+            fresh = self._ws_fresh()
+        if fresh:
             try:
                 # 新版建议WS侧也写 long/short
                 pl = self.store.get_kv_float("ws:pos_long")
@@ -140,40 +169,40 @@ class Portfolio:
             self._set_pos(0.0, 0.0)
             return
 
-        pos_list = []
-        if isinstance(resp, dict):
-            pos_list = resp.get("data") or []
-        elif isinstance(resp, list):
-            # 极端兼容：如果有人把 get_positions 写成直接返回 list
-            pos_list = resp
-
-        # 兼容：data 被错误序列化成字符串
-        if isinstance(pos_list, str):
-            try:
-                pos_list = json.loads(pos_list)
-            except Exception:
-                pos_list = []
-
-        if not isinstance(pos_list, list):
+        # 常见情况：{"code": "0", "data": [...]}，直接拿 list
+        pos_list = resp.get("data") if type(resp) is dict else None
+        if type(pos_list) is not list:
             pos_list = []
+            if isinstance(resp, dict):
+                pos_list = resp.get("data") or []
+            elif isinstance(resp, list):
+                # 极端兼容：如果有人把 get_positions 写成直接返回 list
+                pos_list = resp
+
+            # 兼容：data 被错误序列化成字符串
+            if isinstance(pos_list, (str, bytes)):
+                try:
+                    pos_list = json_loads(pos_list)
+                except Exception:
+                    pos_list = []
+
+            if not isinstance(pos_list, list):
+                pos_list = []
 
         long_sz = 0.0
         short_sz = 0.0
 
         for p in pos_list:
-            if not isinstance(p, dict):
-                continue
-
+            # 单次 C 层取两个字段；缺字段/非 dict/非数值的行直接跳过
             try:
-                sz = float(p.get("pos", "0") or "0")
-            except Exception:
-                sz = 0.0
-
-            side = str(p.get("posSide") or "").lower().strip()
-            if side == "long":
-                long_sz += sz
-            elif side == "short":
-                short_sz += sz
+                side, pos = _side_and_pos(p)
+                side = side.lower()
+                if side == "long":
+                    long_sz += float(pos or 0)
+                elif side == "short":
+                    short_sz += float(pos or 0)
+            except (KeyError, TypeError, ValueError, AttributeError):
+                continue
 
         self._set_pos(long_sz, short_sz)
 
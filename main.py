@@ -12,15 +12,18 @@ main.py - OKX Quant Pro (SIM stable)
 
 from __future__ import annotations
 
-import json
+import logging
 import os
+import struct
 import sys
 import time
 from dataclasses import dataclass
+from operator import itemgetter
 from typing import Any, Dict, Optional, Tuple
 
 import yaml
 
+from utils.fastjson import loads as json_loads
 from utils.logger import get_logger
 from data.store import SQLiteStore
 from exchange.okx_rest import OKXRest
@@ -30,16 +33,13 @@ from exchange.okx_ws_private import OKXPrivateWS
 from execution.portfolio import Portfolio
 from execution.order_manager import OrderManager
 from risk.risk_manager import RiskManager
-from datetime import datetime
-from zoneinfo import ZoneInfo
+from utils.time import sg_day_key
 log = get_logger()
 
 
-SG_TZ = ZoneInfo("Asia/Singapore")
+# 当日 baseline 的进程内缓存：同一天内不再读 KV（pnl:baseline_* 只有这里写）
+_BASELINE_CACHE = {"day": "", "baseline": 0.0}
 
-def sg_day_key(ts: float) -> str:
-    d = datetime.fromtimestamp(ts, SG_TZ).strftime("%Y-%m-%d")
-    return d
 
 def ensure_daily_baseline(store, equity: float) -> float:
     """
@@ -48,6 +48,9 @@ def ensure_daily_baseline(store, equity: float) -> float:
       - 同一天：沿用已有 baseline
     """
     today = sg_day_key(time.time())
+    if _BASELINE_CACHE["day"] == today and _BASELINE_CACHE["baseline"] > 0:
+        return _BASELINE_CACHE["baseline"]
+
     k_day = "pnl:baseline_day"
     k_eq = "pnl:baseline_equity"
 
@@ -60,6 +63,8 @@ def ensure_daily_baseline(store, equity: float) -> float:
         store.set_kv(k_eq, str(baseline))
         log.warning("DAILY BASELINE RESET", extra={"day": today, "baseline_equity": baseline})
 
+    _BASELINE_CACHE["day"] = today
+    _BASELINE_CACHE["baseline"] = baseline
     return baseline
 
 
@@ -76,6 +81,19 @@ def now_ts() -> float:
 
 
 def safe_float(x, default=0.0) -> float:
+    # OKX 字段要么是数字串要么是空串/None：按确切类型分支，常见情况不进异常路径
+    t = type(x)
+    if t is float:
+        return x
+    if t is str:
+        if x:
+            try:
+                return float(x)
+            except ValueError:
+                pass
+        return float(default)
+    if x is None:
+        return float(default)
     try:
         return float(x)
     except Exception:
@@ -89,18 +107,32 @@ def safe_int(x, default=0) -> int:
         return int(default)
 
 
+_BAR_CLOSE_KEYS = ("close", "c", "last", "px")
+_BAR_TS_KEYS = ("ts", "t", "timestamp", "time")
+
+
 def bar_close(bar: Dict[str, Any]) -> float:
+    # 按优先级探测：同一个 dict 里多个字段都有值时，取排在前面的
     if not isinstance(bar, dict):
         return 0.0
-    for k in ("close", "c", "last", "px"):
-        if k in bar and bar[k] is not None:
+    for k in _BAR_CLOSE_KEYS:
+        v = bar.get(k)
+        if v is not None:
             try:
-                return float(bar[k])
+                return float(v)
             except Exception:
-                pass
+                continue
     return 0.0
 
 
+def _to_ms(v: Any) -> int:
+    v = int(float(v))
+    # 如果是秒级，转毫秒（粗略判断）
+    if v < 10_000_000_000:
+        v *= 1000
+    return v
+
+
 def bar_ts_ms(bar: Dict[str, Any]) -> int:
     """
     兼容你 WS / REST bar 的不同字段命名
@@ -108,19 +140,76 @@ def bar_ts_ms(bar: Dict[str, Any]) -> int:
     """
     if not isinstance(bar, dict):
         return 0
-    for k in ("ts", "t", "timestamp", "time"):
-        if k in bar and bar[k] is not None:
+    for k in _BAR_TS_KEYS:
+        v = bar.get(k)
+        if v is not None:
             try:
-                v = int(float(bar[k]))
-                # 如果是秒级，转毫秒（粗略判断）
-                if v < 10_000_000_000:
-                    v *= 1000
-                return v
+                return _to_ms(v)
             except Exception:
-                pass
+                continue
     return 0
 
 
+_BAR_UNIT_MS = {"m": 60_000, "H": 3_600_000, "D": 86_400_000, "W": 604_800_000}
+
+
+def bar_period_ms(bar: str) -> int:
+    """OKX bar 名 -> 周期毫秒（1m/5m/1H/4H/1D/1W，可带 utc 后缀）；月线等不定长返回 0。"""
+    b = str(bar or "").strip()
+    if b.lower().endswith("utc"):
+        b = b[:-3]
+    if len(b) < 2 or not b[:-1].isdigit():
+        return 0
+    return int(b[:-1]) * _BAR_UNIT_MS.get(b[-1], 0)
+
+
+@dataclass(frozen=True, slots=True)
+class RuntimeCfg:
+    """主循环/WS 回调用到的配置，启动时从 cfg 解析一次。"""
+    inst_id: str
+    bar: str
+    fast: int
+    slow: int
+    td_mode: str
+    leverage: int
+    loop_sleep: float
+    pf_refresh_sec: float
+    order_timeout_sec: int
+
+    @classmethod
+    def from_cfg(cls, cfg: dict) -> "RuntimeCfg":
+        trade = cfg.get("trade") or {}
+        strategy = cfg.get("strategy") or {}
+        account = cfg.get("account") or {}
+        return cls(
+            inst_id=str(trade.get("inst_id") or "").strip(),
+            bar=str(trade.get("bar") or "1m").strip(),
+            fast=safe_int(strategy.get("fast"), 9),
+            slow=safe_int(strategy.get("slow"), 21),
+            td_mode=str(account.get("td_mode") or "isolated").strip(),
+            leverage=safe_int(account.get("leverage"), 1),
+            loop_sleep=float(trade.get("loop_sleep_sec", 1) or 1),
+            pf_refresh_sec=float(trade.get("portfolio_refresh_sec", 5) or 5),
+            order_timeout_sec=safe_int(trade.get("order_timeout_sec"), 60),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Keys:
+    """按 inst/bar 固定的 KV key，启动时拼一次，热路径不再做 f-string。"""
+    ws_candle: str
+    ema_rel: str
+    ema_last_ts: str
+
+    @classmethod
+    def for_inst(cls, inst_id: str, bar: str) -> "Keys":
+        return cls(
+            ws_candle=f"ws:candle:{inst_id}:{bar}",
+            ema_rel=f"ema_rel:{inst_id}",
+            ema_last_ts=f"ema_last_ts:{inst_id}",
+        )
+
+
 @dataclass
 class Signal:
     action: str
@@ -128,26 +217,29 @@ class Signal:
     reason: str
 
 
+_pack_ema_pair = struct.Struct("<dd").pack
+
+
 def make_idem(action: str, candle_ts_ms: int, ema_fast: float, ema_slow: float) -> str:
-    # idem 尽量短且稳定：动作 + K线时间 + 两条 EMA
-    return f"SIG_{action}_{candle_ts_ms}_{ema_fast:.4f}_{ema_slow:.4f}"
+    # idem 稳定且唯一：动作 + K线时间 + 两条 EMA 的 IEEE-754 位模式（不走十进制格式化）
+    return f"SIG_{action}_{candle_ts_ms}_{_pack_ema_pair(ema_fast, ema_slow).hex()}"
 
 
 # -----------------------------
 # WS event handlers
 # -----------------------------
-def make_private_ws_handler(cfg: dict, store: SQLiteStore):
-    inst_cfg = str(((cfg.get("trade") or {}).get("inst_id")) or "").strip()
-
-    def _sf(x) -> float:
-        try:
-            if x is None:
-                return 0.0
-            if isinstance(x, str) and x.strip() == "":
-                return 0.0
-            return float(x)
-        except Exception:
-            return 0.0
+# positions 推送每行一次 C 层取出五个字段；OKX 的行总带这些 key，缺字段时才走 .get 兜底
+_POS_FIELDS_KEYS = ("instId", "posSide", "pos", "upl", "uplRatio")
+_pos_fields = itemgetter(*_POS_FIELDS_KEYS)
+_POS_SIDES = frozenset(("long", "short"))
+
+def make_private_ws_handler(rcfg: RuntimeCfg, store: SQLiteStore, on_order=None):
+    inst_cfg = rcfg.inst_id
+    # 上次写入的 ws:* 值：positions 推送里没变的字段不再落库（ws:* 只有这里写）
+    last_kv: Dict[str, str] = {}
+    # 每条腿的 (sz, upl, upl_ratio)：OKX 事件推送只带变化的那条腿，没出现的腿保持上次的值，
+    # 不能当成 0（否则 max_positions=1 门禁会读到假的空仓）；平仓时 OKX 会推 pos="0" 的行
+    legs: Dict[str, Tuple[float, float, float]] = {"long": (0.0, 0.0, 0.0), "short": (0.0, 0.0, 0.0)}
 
     def on_private_event(msg: dict):
         try:
@@ -158,82 +250,85 @@ def make_private_ws_handler(cfg: dict, store: SQLiteStore):
             if ch == "orders":
                 data = msg.get("data") or []
                 if isinstance(data, list) and data and isinstance(data[0], dict):
+                    # 订单推送交给 OrderManager 结算（成交即挂 TP/SL，不等超时查单）
+                    if on_order is not None:
+                        for o in data:
+                            if isinstance(o, dict):
+                                on_order(o)
                     o = data[0]
-                    log.info("WS ORDER UPDATE", extra={
-                        "instId": o.get("instId"),
-                        "clOrdId": o.get("clOrdId"),
-                        "ordId": o.get("ordId"),
-                        "state": o.get("state"),
-                        "side": o.get("side"),
-                        "posSide": o.get("posSide"),
-                        "avgPx": o.get("avgPx"),
-                        "accFillSz": o.get("accFillSz"),
-                    })
+                    if log.isEnabledFor(logging.INFO):
+                        log.info("WS ORDER UPDATE", extra={
+                            "instId": o.get("instId"),
+                            "clOrdId": o.get("clOrdId"),
+                            "ordId": o.get("ordId"),
+                            "state": o.get("state"),
+                            "side": o.get("side"),
+                            "posSide": o.get("posSide"),
+                            "avgPx": o.get("avgPx"),
+                            "accFillSz": o.get("accFillSz"),
+                        })
                 return
 
             # ---- positions：写入实时仓位收益 & 仓位数量 ----
             if ch == "positions":
-                long_sz = short_sz = 0.0
-                long_upl = short_upl = 0.0
-                long_upl_ratio = short_upl_ratio = 0.0
+                # 本次推送里出现的腿（同腿多行累加）
+                seen: Dict[str, Tuple[float, float, float]] = {}
 
                 data = msg.get("data") or []
                 if isinstance(data, list):
+                    sf = safe_float
                     for p in data:
-                        if not isinstance(p, dict):
-                            continue
-
-                        inst_id = str(p.get("instId") or "").strip()
+                        try:
+                            inst_id, pos_side, pos, upl, upl_ratio = _pos_fields(p)
+                        except (KeyError, TypeError):
+                            if not isinstance(p, dict):
+                                continue
+                            inst_id, pos_side, pos, upl, upl_ratio = (p.get(k) for k in _POS_FIELDS_KEYS)
+
+                        # OKX 的 instId/posSide 本身就是干净的小写串，只有异常值才做规范化
                         if inst_cfg and inst_id and inst_id != inst_cfg:
                             continue
+                        if pos_side not in _POS_SIDES:
+                            pos_side = str(pos_side or "").lower().strip()
+
+                        if pos_side in _POS_SIDES:
+                            acc = seen.get(pos_side)
+                            if acc is None:
+                                seen[pos_side] = (abs(sf(pos)), sf(upl), sf(upl_ratio))
+                            else:
+                                seen[pos_side] = (acc[0] + abs(sf(pos)), acc[1] + sf(upl), sf(upl_ratio))
 
-                        pos_side = str(p.get("posSide") or "").lower().strip()  # long/short
-                        pos = _sf(p.get("pos"))
-                        upl = _sf(p.get("upl"))
-                        upl_ratio = _sf(p.get("uplRatio"))
-
-                        if pos_side == "long":
-                            long_sz += abs(pos)
-                            long_upl += upl
-                            long_upl_ratio = upl_ratio
-                        elif pos_side == "short":
-                            short_sz += abs(pos)
-                            short_upl += upl
-                            short_upl_ratio = upl_ratio
-
-                # KV：给 Portfolio/main 使用
-                store.set_kv("ws:pos_long", str(long_sz))
-                store.set_kv("ws:pos_short", str(short_sz))
-                store.set_kv("ws:upl_long", str(long_upl))
-                store.set_kv("ws:upl_short", str(short_upl))
-                store.set_kv("ws:upl_ratio_long", str(long_upl_ratio))
-                store.set_kv("ws:upl_ratio_short", str(short_upl_ratio))
-
-                # 兼容旧逻辑（单向）
+                legs.update(seen)
+                long_sz, long_upl, long_upl_ratio = legs["long"]
+                short_sz, short_upl, short_upl_ratio = legs["short"]
+
+                # KV：给 Portfolio/main 使用；只写变化的字段，一次 mset = 一个事务 + executemany
                 has_pos = (long_sz > 0) or (short_sz > 0)
-                store.set_kv("ws:has_pos", "1" if has_pos else "0")
-                if long_sz > 0 and short_sz == 0:
-                    store.set_kv("ws:pos_side", "long")
-                    store.set_kv("ws:pos_sz", str(long_sz))
-                elif short_sz > 0 and long_sz == 0:
-                    store.set_kv("ws:pos_side", "short")
-                    store.set_kv("ws:pos_sz", str(short_sz))
-                elif not has_pos:
-                    store.set_kv("ws:pos_side", "")
-                    store.set_kv("ws:pos_sz", "0")
+                # 兼容旧逻辑（单向）：取仓位更大的一边（单边持仓时即该边），无仓为 ""/"0"
+                if has_pos:
+                    one_side, one_sz = ("long", str(long_sz)) if long_sz >= short_sz else ("short", str(short_sz))
                 else:
-                    # 同时存在多空：选仓位更大的一边
-                    if long_sz >= short_sz:
-                        store.set_kv("ws:pos_side", "long")
-                        store.set_kv("ws:pos_sz", str(long_sz))
-                    else:
-                        store.set_kv("ws:pos_side", "short")
-                        store.set_kv("ws:pos_sz", str(short_sz))
-
-                # 用于判断 WS 快照是否新鲜
-                store.set_kv("ws_private:uptime", str(time.time()))
-
-                # 打印实时仓位收益（你要的“收益额/收益率”）
+                    one_side, one_sz = "", "0"
+                snap = {
+                    "ws:pos_long": str(long_sz),
+                    "ws:pos_short": str(short_sz),
+                    "ws:upl_long": str(long_upl),
+                    "ws:upl_short": str(short_upl),
+                    "ws:upl_ratio_long": str(long_upl_ratio),
+                    "ws:upl_ratio_short": str(short_upl_ratio),
+                    "ws:has_pos": "1" if has_pos else "0",
+                    "ws:pos_side": one_side,
+                    "ws:pos_sz": one_sz,
+                }
+                changed = {k: v for k, v in snap.items() if last_kv.get(k) != v}
+                # 用于判断 WS 快照是否新鲜：每次推送都要写（Portfolio._ws_fresh 读同一个 key）
+                changed["ws_private:last_uptime"] = str(time.time())
+                store.mset(changed)
+                last_kv.update(changed)
+
+                # 打印实时仓位收益（你要的“收益额/收益率”）；INFO 关闭时不构造 extra
+                if not log.isEnabledFor(logging.INFO):
+                    return
                 if long_sz > 0:
                     log.info("POS PNL LONG", extra={
                         "pos": round(long_sz, 6),
@@ -251,7 +346,7 @@ def make_private_ws_handler(cfg: dict, store: SQLiteStore):
             # ---- account：可选打印 ----
             if ch == "account":
                 data = msg.get("data") or []
-                if isinstance(data, list) and data and isinstance(data[0], dict):
+                if isinstance(data, list) and data and isinstance(data[0], dict) and log.isEnabledFor(logging.INFO):
                     a = data[0]
                     log.info("WS ACCOUNT", extra={"totalEq": a.get("totalEq"), "uTime": a.get("uTime")})
                 return
@@ -275,9 +370,10 @@ def make_private_ws_handler(cfg: dict, store: SQLiteStore):
 # Bar source (WS first, REST fallback)
 # -----------------------------
 def get_latest_bar_and_ema(
-    cfg: dict,
+    rcfg: RuntimeCfg,
     ex: OKXRest,
     store: SQLiteStore,
+    keys: Keys,
 ) -> Tuple[Optional[Dict[str, Any]], float, float]:
     """
     返回：
@@ -287,17 +383,17 @@ def get_latest_bar_and_ema(
       1) 如果项目里 OKXPublicWS 已把 candle 写入 store（ws:candle:...），就直接读
       2) 否则调用 REST：ex.get_latest_bar_with_ema(...)
     """
-    inst_id = str((cfg.get("trade") or {}).get("inst_id") or "").strip()
-    bar_name = str((cfg.get("trade") or {}).get("bar") or "1m").strip()
-    fast = safe_int((cfg.get("strategy") or {}).get("fast"), 9)
-    slow = safe_int((cfg.get("strategy") or {}).get("slow"), 21)
+    inst_id = rcfg.inst_id
+    bar_name = rcfg.bar
+    fast = rcfg.fast
+    slow = rcfg.slow
 
     # 1) WS -> store（如果你 public ws 有写入）
-    ws_key = f"ws:candle:{inst_id}:{bar_name}"
+    ws_key = keys.ws_candle
     try:
         raw = store.get_kv(ws_key)
         if raw:
-            obj = json.loads(raw)
+            obj = json_loads(raw)
             # 你 store 里可能写的是 {"bar":{...}, "ema_fast":..., "ema_slow":...}
             if isinstance(obj, dict) and "bar" in obj:
                 b = obj.get("bar") or {}
@@ -337,7 +433,7 @@ def get_latest_bar_and_ema(
 # -----------------------------
 def generate_signal_from_ema(
     store: SQLiteStore,
-    inst_id: str,
+    keys: Keys,
     candle_ts_ms: int,
     ema_fast: float,
     ema_slow: float,
@@ -352,35 +448,35 @@ def generate_signal_from_ema(
     if candle_ts_ms <= 0 or ema_fast <= 0 or ema_slow <= 0:
         return None
 
-    prev_rel = store.get_kv(f"ema_rel:{inst_id}") or ""
+    rel_key = keys.ema_rel
+    ts_key = keys.ema_last_ts
+    # 上一根关系 + 上一根 ts 一条 SELECT 取回
+    kv = store.mget((rel_key, ts_key))
+    prev_rel = kv[rel_key] or ""
     rel = "GT" if ema_fast > ema_slow else "LT"
 
     # 首次只记录，不发单（避免开机立刻下单）
     if not prev_rel:
-        store.set_kv(f"ema_rel:{inst_id}", rel)
-        store.set_kv(f"ema_last_ts:{inst_id}", str(candle_ts_ms))
+        store.mset({rel_key: rel, ts_key: str(candle_ts_ms)})
         return None
 
     # 同一根K线不重复发信号
-    last_ts = safe_int(store.get_kv(f"ema_last_ts:{inst_id}") or "0", 0)
+    last_ts = safe_int(kv[ts_key] or "0", 0)
     if candle_ts_ms == last_ts:
         return None
 
-    store.set_kv(f"ema_last_ts:{inst_id}", str(candle_ts_ms))
+    # ts + 关系一个事务写入（无论是否交叉都更新关系）
+    store.mset({ts_key: str(candle_ts_ms), rel_key: rel})
 
     # 交叉判定
     if prev_rel == "LT" and rel == "GT":
-        store.set_kv(f"ema_rel:{inst_id}", rel)
         idem = make_idem("LONG", candle_ts_ms, ema_fast, ema_slow)
         return Signal(action="OPEN_LONG", idempotency_key=idem, reason="EMA golden cross")
 
     if prev_rel == "GT" and rel == "LT":
-        store.set_kv(f"ema_rel:{inst_id}", rel)
         idem = make_idem("SHORT", candle_ts_ms, ema_fast, ema_slow)
         return Signal(action="OPEN_SHORT", idempotency_key=idem, reason="EMA dead cross")
 
-    # 无交叉，只更新关系
-    store.set_kv(f"ema_rel:{inst_id}", rel)
     return None
 
 
@@ -398,9 +494,11 @@ def main():
     env = cfg.get("env") or {}
     demo = bool(env.get("demo", True))
 
-    inst_id = str((cfg.get("trade") or {}).get("inst_id") or "").strip()
-    td_mode = str((cfg.get("account") or {}).get("td_mode") or "isolated").strip()
-    leverage = safe_int((cfg.get("account") or {}).get("leverage"), 1)
+    rcfg = RuntimeCfg.from_cfg(cfg)
+    keys = Keys.for_inst(rcfg.inst_id, rcfg.bar)
+    inst_id = rcfg.inst_id
+    td_mode = rcfg.td_mode
+    leverage = rcfg.leverage
     use_ws = bool(env.get("use_ws", True))
     use_private_ws = bool(env.get("use_private_ws", True))
 
@@ -434,11 +532,8 @@ def main():
         except Exception as e:
             log.warning("BOOTSTRAP FAILED", extra={"err": str(e)})
 
-    # ---- portfolio（你的 Portfolio 已做参数顺序自适应的话，两种都可以）
-    try:
-        portfolio = Portfolio(cfg, ex, store)
-    except TypeError:
-        portfolio = Portfolio(ex, store, cfg)
+    # ---- portfolio
+    portfolio = Portfolio(ex, store, cfg)
 
     # ---- risk
     try:
@@ -465,7 +560,7 @@ def main():
     # Private WS（用于订单/仓位/余额回报）
     if use_private_ws:
         try:
-            on_private_event = make_private_ws_handler(cfg, store)
+            on_private_event = make_private_ws_handler(rcfg, store, on_order=om.on_ws_order)
             pws = OKXPrivateWS(cfg, store, on_event=on_private_event)
             pws.start()
         except Exception as e:
@@ -482,16 +577,21 @@ def main():
             "lev": leverage,
             "use_ws": bool(wss),
             "use_private_ws": bool(pws),
-            "order_timeout_sec": safe_int((cfg.get("trade") or {}).get("order_timeout_sec"), 60),
+            "order_timeout_sec": rcfg.order_timeout_sec,
             "proxy": bool((cfg.get("proxy") or {}).get("enabled", False)),
         },
     )
 
     # ---- main loop
     last_pf_refresh = 0.0
-    pf_refresh_sec = float((cfg.get("trade") or {}).get("portfolio_refresh_sec", 5) or 5)
+    # 信号只在新 K 线的第一个 tick 产生（generate_signal_from_ema 按 ts 去重），
+    # 所以下一根 K 线开盘前不必再取 bar / 算 EMA
+    bar_ms = bar_period_ms(rcfg.bar)
+    last_bar_ts = 0
+    next_bar_ms = 0
+    pf_refresh_sec = rcfg.pf_refresh_sec
 
-    loop_sleep = float((cfg.get("trade") or {}).get("loop_sleep_sec", 1) or 1)
+    loop_sleep = rcfg.loop_sleep
 
     try:
         while True:
@@ -501,10 +601,12 @@ def main():
             if (t0 - last_pf_refresh) >= pf_refresh_sec:
                 try:
                     portfolio.refresh()
-                    upl_long = store.get_kv_float("ws:upl_long") or 0.0
-                    upl_short = store.get_kv_float("ws:upl_short") or 0.0
-                    r_long = store.get_kv_float("ws:upl_ratio_long") or 0.0
-                    r_short = store.get_kv_float("ws:upl_ratio_short") or 0.0
+                    # 四个 ws:* 快照一条 SELECT ... IN (...) 取回
+                    snap = store.mget(("ws:upl_long", "ws:upl_short", "ws:upl_ratio_long", "ws:upl_ratio_short"))
+                    upl_long = safe_float(snap["ws:upl_long"], 0.0)
+                    upl_short = safe_float(snap["ws:upl_short"], 0.0)
+                    r_long = safe_float(snap["ws:upl_ratio_long"], 0.0)
+                    r_short = safe_float(snap["ws:upl_ratio_short"], 0.0)
 
                     log.info("POS PNL SNAPSHOT", extra={
                         "11111收益额:upl_long_usdt": round(upl_long, 4),
@@ -546,21 +648,31 @@ def main():
             except Exception as e:
                 log.error("ORDER HOUSEKEEP ERROR", extra={"err": str(e)})
 
-            # 3) 获取最新 bar + EMA（WS优先，REST fallback）
-            try:
-                bar, ema_fast, ema_slow = get_latest_bar_and_ema(cfg, ex, store)
-            except Exception as e:
-                log.error("BAR FETCH ERROR", extra={"err": str(e)})
-                bar, ema_fast, ema_slow = None, 0.0, 0.0
+            # 3) 获取最新 bar + EMA（WS优先，REST fallback）；当前 K 线已处理过则等到下一根开盘
+            bar, ema_fast, ema_slow = None, 0.0, 0.0
+            if t0 * 1000 >= next_bar_ms:
+                try:
+                    bar, ema_fast, ema_slow = get_latest_bar_and_ema(rcfg, ex, store, keys)
+                except Exception as e:
+                    log.error("BAR FETCH ERROR", extra={"err": str(e)})
+                    bar, ema_fast, ema_slow = None, 0.0, 0.0
+
+            ts_ms = bar_ts_ms(bar) if bar else 0
+            if ts_ms and ts_ms == last_bar_ts:
+                # 交易所还没出新 K 线：下轮再取
+                bar = None
+            elif ts_ms:
+                last_bar_ts = ts_ms
+                if bar_ms > 0:
+                    next_bar_ms = ts_ms + bar_ms
 
             if bar:
                 c = bar_close(bar)
-                ts_ms = bar_ts_ms(bar)
 
                 # 4) 策略产生信号
                 sig = None
                 try:
-                    sig = generate_signal_from_ema(store, inst_id, ts_ms, ema_fast, ema_slow)
+                    sig = generate_signal_from_ema(store, keys, ts_ms, ema_fast, ema_slow)
                 except Exception as e:
                     log.error("SIGNAL GEN ERROR", extra={"err": str(e)})
 
@@ -586,7 +698,10 @@ def main():
             except Exception:
                 pass
 
-            time.sleep(loop_sleep)
+            # 固定节拍：只睡本轮剩余时间，REST 耗时不再叠加到循环周期上
+            elapsed = now_ts() - t0
+            if elapsed < loop_sleep:
+                time.sleep(loop_sleep - elapsed)
 
     except KeyboardInterrupt:
         log.warning("EXIT by KeyboardInterrupt", extra={})
@@ -601,6 +716,10 @@ def main():
                 pws.stop()
         except Exception:
             pass
+        try:
+            om.close()
+        except Exception:
+            pass
 
 
 if __name__ == "__main__":
@@ -1,7 +1,4 @@
-from datetime import datetime
-from zoneinfo import ZoneInfo
-
-SG_TZ = ZoneInfo("Asia/Singapore")
+from utils.time import sg_today
 
 class RiskManager:
     def __init__(self, store, cfg):
@@ -9,7 +6,7 @@ class RiskManager:
         self.cfg = cfg
 
     def _today_sg(self) -> str:
-        return datetime.now(SG_TZ).date().isoformat()
+        return sg_today()
 
     def ensure_daily_reset(self, portfolio):
         today = self._today_sg()
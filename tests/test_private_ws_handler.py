@@ -0,0 +1,37 @@
+import main
+from data.store import SQLiteStore
+
+INST = "BTC-USDT-SWAP"
+
+
+def _handler(tmp_path):
+    store = SQLiteStore(str(tmp_path / "t.db"))
+    rcfg = main.RuntimeCfg.from_cfg({"trade": {"inst_id": INST}})
+    return store, main.make_private_ws_handler(rcfg, store)
+
+
+def _push(h, *rows):
+    h({"arg": {"channel": "positions"}, "data": [dict(instId=INST, upl="0", uplRatio="0", **r) for r in rows]})
+
+
+def test_one_leg_push_keeps_other_leg(tmp_path):
+    store, h = _handler(tmp_path)
+    # 快照推送：双向持仓
+    _push(h, {"posSide": "long", "pos": "2"}, {"posSide": "short", "pos": "3"})
+    # 事件推送只带 long：short 不能被写成 0
+    _push(h, {"posSide": "long", "pos": "5"})
+    assert store.get_kv_float("ws:pos_long") == 5.0
+    assert store.get_kv_float("ws:pos_short") == 3.0
+    assert store.get_kv("ws:has_pos") == "1"
+
+
+def test_leg_closes_only_on_its_own_row(tmp_path):
+    store, h = _handler(tmp_path)
+    _push(h, {"posSide": "short", "pos": "3"})
+    _push(h, {"posSide": "long", "pos": "1"})
+    assert store.get_kv_float("ws:pos_short") == 3.0
+    # 平仓：OKX 推 pos="0" 的行
+    _push(h, {"posSide": "short", "pos": "0"})
+    assert store.get_kv_float("ws:pos_short") == 0.0
+    assert store.get_kv_float("ws:pos_long") == 1.0
+    assert store.get_kv("ws:pos_side") == "long"
@@ -0,0 +1,48 @@
+"""Best-effort CPU pinning for latency-sensitive threads.
+
+Opt-in via env (e.g. OKX_WS_CPU=2). Failure is never fatal: returns False.
+"""
+import os
+import sys
+import threading
+from typing import Optional
+
+
+def cpu_from_env(name: str) -> Optional[int]:
+    v = os.getenv(name, "").strip()
+    if not v:
+        return None
+    try:
+        cpu = int(v)
+    except ValueError:
+        return None
+    return cpu if cpu >= 0 else None
+
+
+def pin_current_thread(cpu: Optional[int], raise_priority: bool = True) -> bool:
+    """把调用线程绑到指定核心；必须在目标线程内部调用。"""
+    if cpu is None:
+        return False
+    try:
+        if hasattr(os, "sched_setaffinity"):
+            # Linux：pid=0 即当前线程
+            os.sched_setaffinity(0, {cpu})
+            if raise_priority:
+                try:
+                    os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), -5)  # 需要 CAP_SYS_NICE，没有就算了
+                except (AttributeError, OSError):
+                    pass
+            return True
+        if sys.platform == "win32":
+            import ctypes
+
+            k32 = ctypes.windll.kernel32
+            h = k32.GetCurrentThread()
+            if not k32.SetThreadAffinityMask(h, 1 << cpu):
+                return False
+            if raise_priority:
+                k32.SetThreadPriority(h, 1)  # THREAD_PRIORITY_ABOVE_NORMAL
+            return True
+    except (OSError, ValueError):
+        return False
+    return False
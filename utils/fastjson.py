@@ -0,0 +1,26 @@
+"""JSON helpers: orjson (C) when installed, stdlib json otherwise.
+
+- loads(): accepts str or bytes
+- dumps_bytes(): compact UTF-8 bytes (same as json.dumps(separators=(",", ":"), ensure_ascii=False))
+- dumps(): same as dumps_bytes() but returns str
+"""
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # 可选加速，未安装时退回 stdlib
+    orjson = None
+
+if orjson is not None:
+    loads = orjson.loads
+    dumps_bytes = orjson.dumps
+else:
+    loads = json.loads
+
+    def dumps_bytes(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def dumps(obj: Any) -> str:
+    return dumps_bytes(obj).decode("utf-8")
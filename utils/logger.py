@@ -1,28 +1,56 @@
 import logging
 import sys
 
+from utils.fastjson import dumps as json_dumps
+
+
+class _ExtraAdapter(logging.LoggerAdapter):
+    """log.info(msg, extra={...})：extra 整体挂到 record.extra，避免与 LogRecord 自带字段（msg/args…）冲突。
+
+    LoggerAdapter 在 isEnabledFor 之后才调 process，被过滤的级别不会构造任何东西。
+    """
+
+    def process(self, msg, kwargs):
+        extra = kwargs.get("extra")
+        kwargs["extra"] = {"extra": extra if extra is not None else {}}
+        return msg, kwargs
+
+
+class _ExtraFormatter(logging.Formatter):
+    """%(extra)s 输出为紧凑 JSON（orjson 可用时走 C 实现）；序列化失败退回 repr。"""
+
+    def format(self, record):
+        extra = getattr(record, "extra", None)
+        if isinstance(extra, dict):
+            try:
+                record.extra = json_dumps(extra)
+            except (TypeError, ValueError):
+                record.extra = repr(extra)
+        elif extra is None:
+            record.extra = "{}"
+        return super().format(record)
+
+
+_adapter = None
+
+
 def get_logger():
+    global _adapter
+    if _adapter is not None:
+        return _adapter
+
     logger = logging.getLogger("okx_quant")
-    if logger.handlers:
-        return logger
-
-    logger.setLevel(logging.INFO)
-    h = logging.StreamHandler(sys.stdout)
-    fmt = logging.Formatter(
-        fmt="%(asctime)s %(levelname)s %(message)s %(extra)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
-    h.setFormatter(fmt)
-    logger.addHandler(h)
-
-    def _log_with_extra(level, msg, extra=None):
-        if extra is None:
-            extra = {}
-        logger.log(level, msg, extra={"extra": extra})
-
-    logger.info = lambda msg, extra=None: _log_with_extra(logging.INFO, msg, extra)
-    logger.warning = lambda msg, extra=None: _log_with_extra(logging.WARNING, msg, extra)
-    logger.error = lambda msg, extra=None: _log_with_extra(logging.ERROR, msg, extra)
-    logger.exception = lambda msg, extra=None: _log_with_extra(logging.ERROR, msg, extra)
-
-    return logger
+    if not logger.handlers:
+        logger.setLevel(logging.INFO)
+        h = logging.StreamHandler(sys.stdout)
+        fmt = _ExtraFormatter(
+            fmt="%(asctime)s %(levelname)s %(message)s %(extra)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        )
+        h.setFormatter(fmt)
+        logger.addHandler(h)
+        # 只走自己的 handler，不再冒泡到 root 重复格式化
+        logger.propagate = False
+
+    _adapter = _ExtraAdapter(logger, {})
+    return _adapter
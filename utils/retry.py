@@ -1,3 +1,4 @@
+import random
 import time
 from typing import Callable, Type, Tuple
 
@@ -6,6 +7,8 @@ def retry(
     delay: float = 0.5,
     backoff: float = 2.0,
     exceptions: Tuple[Type[BaseException], ...] = (Exception,),
+    max_wait: float = 10.0,
+    jitter: bool = True,
 ):
     def deco(fn: Callable):
         def wrapper(*args, **kwargs):
@@ -19,7 +22,13 @@ def retry(
                     _tries -= 1
                     if _tries <= 0:
                         raise
-                    time.sleep(_delay)
+                    # 异常若带 wait（如限频的 Retry-After），按它精确等待；
+                    # 否则指数退避 + 抖动（0.5x~1.5x），避免多个调用点同步重试
+                    wait = getattr(e, "wait", None)
+                    if wait is not None:
+                        time.sleep(min(wait, max_wait))
+                    else:
+                        time.sleep(_delay * (0.5 + random.random()) if jitter else _delay)
                     _delay *= backoff
             raise last_exc
         return wrapper
@@ -0,0 +1,43 @@
+"""Singapore trading-day helpers.
+
+SGT 固定 UTC+8、无夏令时：日界用常量偏移计算，不走 datetime/zoneinfo。
+日期字符串按天缓存，只在跨过当日零点区间时才重新格式化。
+"""
+import time
+
+SG_OFFSET_S = 8 * 3600
+_DAY_S = 86400
+
+
+class DayClock:
+    """缓存 [当日零点, 次日零点) 的 epoch 区间与日期字符串（YYYY-MM-DD）。"""
+
+    __slots__ = ("offset_s", "_cache")
+
+    def __init__(self, offset_s: int):
+        self.offset_s = offset_s
+        # (start, end, day) 整体替换：多线程读到的永远是一致的组合
+        self._cache = (0.0, 0.0, "")
+
+    def day_key(self, ts: float) -> str:
+        start, end, day = self._cache
+        # 快路径：同一天内只做两次 float 比较
+        if start <= ts < end:
+            return day
+        local = ts + self.offset_s
+        start = ts - local % _DAY_S
+        day = time.strftime("%Y-%m-%d", time.gmtime(local))
+        self._cache = (start, start + _DAY_S, day)
+        return day
+
+
+_SG_CLOCK = DayClock(SG_OFFSET_S)
+
+
+def sg_day_key(ts: float) -> str:
+    """ts（epoch 秒）对应的新加坡日期 YYYY-MM-DD。"""
+    return _SG_CLOCK.day_key(ts)
+
+
+def sg_today() -> str:
+    return _SG_CLOCK.day_key(time.time())